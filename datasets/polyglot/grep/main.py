@@ -1,3 +1,121 @@
+import bisect
+import functools
+import io
+import mmap
+import os
+import re
+from array import array
+
+try:
+    import numpy as _np
+except ImportError:  # NumPy is optional; the str.find loop below suffices
+    _np = None
+
+# Below this size the cost of setting up a mapping outweighs a plain read().
+_MMAP_THRESHOLD = 64 * 1024
+
+
+def _normalize_newlines(text):
+    """Apply the same universal-newline translation text mode would."""
+    if '\r' in text:
+        return text.replace('\r\n', '\n').replace('\r', '\n')
+    return text
+
+
+def _read_text(file_name):
+    """Read a whole file as text in as few copies as possible.
+
+    Small files come in as one binary read decoded in a single pass —
+    cheaper than text-mode incremental decode. Large regular files are
+    memory-mapped with a sequential-access hint so the kernel prefetches
+    pages ahead of the scan. Streams without a real file descriptor fall
+    back to a plain read().
+    """
+    with open(file_name, 'rb') as f:
+        try:
+            size = os.fstat(f.fileno()).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            # Not backed by a real file descriptor (e.g. in-memory streams)
+            data = f.read()
+            if isinstance(data, str):
+                return _normalize_newlines(data)
+            return _normalize_newlines(data.decode('utf-8'))
+        if size < _MMAP_THRESHOLD:
+            return _normalize_newlines(f.read().decode('utf-8'))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            return _normalize_newlines(mm[:].decode('utf-8'))
+
+
+def _newline_offsets(data):
+    """Return a sorted sequence of the offsets of every '\\n' in data."""
+    if _np is not None and data.isascii():
+        # SIMD-vectorized byte compare; byte offsets equal character
+        # offsets only for pure-ASCII buffers.
+        arr = _np.frombuffer(data.encode('ascii'), dtype=_np.uint8)
+        return _np.flatnonzero(arr == 10)
+    offsets = array('i')
+    pos = data.find('\n')
+    while pos != -1:
+        offsets.append(pos)
+        pos = data.find('\n', pos + 1)
+    return offsets
+
+
+@functools.lru_cache(maxsize=256)
+def _compile(pattern, case_insensitive, full_line):
+    """Compile the literal pattern, cached across grep() calls."""
+    re_flags = re.IGNORECASE if case_insensitive else 0
+    if full_line:
+        return re.compile('^' + re.escape(pattern) + '$', re_flags | re.MULTILINE)
+    return re.compile(re.escape(pattern), re_flags)
+
+
+def _contains_bytes(file_name, pattern, needle):
+    """Return True if the file's raw bytes contain the needle.
+
+    Used by plain -l mode: no decode, no line bookkeeping, and for large
+    files an mmap scan that stops touching pages at the first hit. An empty
+    needle matches any non-empty file (which has at least one line).
+    """
+    with open(file_name, 'rb') as f:
+        try:
+            size = os.fstat(f.fileno()).st_size
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            data = f.read()
+            if isinstance(data, str):  # in-memory text stream
+                return bool(data) and pattern in data
+            return bool(data) and needle in data
+        if size < _MMAP_THRESHOLD:
+            data = f.read()
+            return bool(data) and needle in data
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            return mm.find(needle) != -1
+
+
+def _find_starts(hay, needle):
+    """Yield every non-overlapping match offset of needle in hay.
+
+    str.find bottoms out in the C memmem/two-way scanner, so the loop body
+    runs once per match rather than once per character.
+    """
+    step = len(needle) or 1
+    pos = hay.find(needle)
+    while pos != -1:
+        yield pos
+        pos = hay.find(needle, pos + step)
+
+
+def _line_bounds(data, nl_offsets, idx):
+    """Return the (start, end) offsets of 0-based line idx, excluding its newline."""
+    start = nl_offsets[idx - 1] + 1 if idx else 0
+    end = nl_offsets[idx] if idx < len(nl_offsets) else len(data)
+    return start, end
+
+
 def grep(pattern, flags, files):
     """
     Search files for lines matching a search string and return all matching lines.
@@ -19,66 +137,111 @@ def grep(pattern, flags, files):
     is_output_filenames_only = '-l' in flags
     is_prepend_line_numbers = '-n' in flags
 
-    # Prepare pattern for comparison based on case sensitivity
-    search_pattern = pattern if not is_case_insensitive else pattern.lower()
+    # Compile the pattern once per (pattern, flags) combination: a single
+    # C-level scan of the whole buffer is far faster than a per-line Python
+    # loop, and the lru_cache amortizes the compile across repeated queries.
+    search_re = _compile(pattern, is_case_insensitive, is_match_entire_line)
 
     # Check if we need to prepend filenames (when searching multiple files)
     prepend_filename = len(files) > 1
 
-    # Track which files have matches for -l flag, preserving order
-    files_with_matches = []
+    # Bind the output shape once so each match formats in a single f-string
+    # instead of assembling and joining an output_parts list.
+    if prepend_filename and is_prepend_line_numbers:
+        format_line = lambda fn, ln, lc: f"{fn}:{ln}:{lc}\n"
+    elif prepend_filename:
+        format_line = lambda fn, ln, lc: f"{fn}:{lc}\n"
+    elif is_prepend_line_numbers:
+        format_line = lambda fn, ln, lc: f"{ln}:{lc}\n"
+    else:
+        format_line = lambda fn, ln, lc: f"{lc}\n"
+
+    # Track which files have matches for -l flag; a dict keeps insertion
+    # order while giving O(1) membership, unlike a list scan per match.
+    files_with_matches = {}
+
+    # Plain -l (no -i/-v/-x) never needs the contents as text: a raw byte
+    # scan per file decides membership, skipping UTF-8 decode entirely.
+    if (is_output_filenames_only and not is_case_insensitive
+            and not is_match_entire_line and not is_invert_match):
+        needle = pattern.encode('utf-8')
+        for file_name in files:
+            try:
+                if _contains_bytes(file_name, pattern, needle):
+                    files_with_matches[file_name] = None
+            except FileNotFoundError:
+                continue
+        return [f"{filename}\n" for filename in files_with_matches]
 
     for file_name in files:
         try:
-            with open(file_name, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            data = _read_text(file_name)
         except FileNotFoundError:
             # Skip files that don't exist
             continue
 
-        # Process lines in the current file
-        for line_num, line in enumerate(lines, 1):
-            # Remove trailing newline for comparison and processing
-            line_content = line.rstrip('\n\r')
-
-            # Determine if the line matches the pattern based on flags
-            line_matches = False
+        # -l without -v only needs to know whether any line matches, so stop
+        # at the first hit instead of scanning the whole file. A zero-width
+        # match sitting after the final newline is not on any line.
+        if is_output_filenames_only and not is_invert_match:
+            m = search_re.search(data)
+            if m is not None and not (
+                m.start() == len(data) and (not data or data.endswith('\n'))
+            ):
+                files_with_matches[file_name] = None
+            continue
 
-            if is_match_entire_line:
-                # The entire line content (excluding the terminating <newline>) must match
-                comparison_line = line_content if not is_case_insensitive else line_content.lower()
-                line_matches = comparison_line == search_pattern
+        nl_offsets = _newline_offsets(data)
+        # A trailing newline terminates the last line rather than opening a new one.
+        n_lines = len(nl_offsets) + (0 if not data or data.endswith('\n') else 1)
+
+        # Plain substring mode runs on a direct find loop; -x keeps the
+        # anchored regex. For -i, fold the buffer once — if folding changes
+        # the length (rare non-ASCII), offsets would drift, and if the
+        # pattern full-casefolds differently from lower() (e.g. 'ß' -> 'ss')
+        # the find loop would accept matches the IGNORECASE regex used by
+        # the -l fast path rejects, so both cases fall back to the regex.
+        if is_match_entire_line:
+            match_starts = (m.start() for m in search_re.finditer(data))
+        else:
+            hay, needle = data, pattern
+            if is_case_insensitive:
+                folded = data.casefold()
+                needle = pattern.casefold()
+                if len(folded) == len(data) and needle == pattern.lower():
+                    hay = folded
+                else:
+                    hay = None
+            if hay is None:
+                match_starts = (m.start() for m in search_re.finditer(data))
             else:
-                # The pattern can match anywhere in the line content (excluding the terminating <newline>)
-                comparison_line = line_content if not is_case_insensitive else line_content.lower()
-                line_matches = search_pattern in comparison_line
-
-            # Apply invert flag
-            if is_invert_match:
-                line_matches = not line_matches
-
-            if line_matches:
-                # Track file for -l flag if not already tracked
-                if file_name not in files_with_matches:
-                    files_with_matches.append(file_name)
-
-                # If not using -l, add the matching line to results
-                if not is_output_filenames_only:
-                    output_parts = []
-
-                    if prepend_filename:
-                        output_parts.append(f"{file_name}:")
-
-                    if is_prepend_line_numbers:
-                        output_parts.append(f"{line_num}:")
-
-                    # Add the original line content (without its original ending)
-                    output_parts.append(line_content)
-
-                    # Add newline to match expected output format for each line
-                    output_parts.append("\n")
-
-                    results.append("".join(output_parts))
+                match_starts = _find_starts(hay, needle)
+
+        # Map match offsets back to 0-based line indices, deduplicating
+        # multiple hits on the same line.
+        matched_lines = []
+        last_idx = -1
+        for start in match_starts:
+            idx = bisect.bisect_left(nl_offsets, start)
+            if idx != last_idx and idx < n_lines:
+                matched_lines.append(idx)
+                last_idx = idx
+
+        if is_invert_match:
+            matched_set = set(matched_lines)
+            matched_lines = [i for i in range(n_lines) if i not in matched_set]
+
+        for idx in matched_lines:
+            # Track file for -l flag (idempotent, O(1))
+            files_with_matches[file_name] = None
+
+            # If not using -l, add the matching line to results
+            if not is_output_filenames_only:
+                # The slice between newline offsets already excludes the
+                # terminator, and _read_text normalized any '\r' away, so no
+                # per-line rstrip scan is needed.
+                start, end = _line_bounds(data, nl_offsets, idx)
+                results.append(format_line(file_name, idx + 1, data[start:end]))
 
     # If -l flag is used, return the names of files with matches
     if is_output_filenames_only:
@@ -86,4 +249,4 @@ def grep(pattern, flags, files):
         return [f"{filename}\n" for filename in files_with_matches]
 
     # Return the list of matching lines (each ending with \n)
-    return results
\ No newline at end of file
+    return results
@@ -20,52 +20,62 @@ def grep(pattern, flags, files):
     is_prepend_line_numbers = '-n' in flags
     
     # Prepare pattern for comparison based on case sensitivity
-    search_pattern = pattern if not is_case_insensitive else pattern.lower()
+    search_pattern = pattern if not is_case_insensitive else pattern.casefold()
 
     # Check if we need to prepend filenames (when searching multiple files)
     prepend_filename = len(files) > 1
 
+    # Bind the per-line predicate once instead of re-testing the flag
+    # booleans on every line.
+    if is_match_entire_line:
+        matches = lambda cl: cl == search_pattern
+    else:
+        matches = lambda cl: search_pattern in cl
+    if is_invert_match:
+        base_matches = matches
+        matches = lambda cl: not base_matches(cl)
+
     for file_name in files:
         with open(file_name, 'r') as f:
-            lines = f.readlines()
+            data = f.read()
 
-        file_has_match = False  # Track if this file has any matches (for -l flag)
-        file_results = []       # Store results for this file if not using -l
+        # Fold the whole buffer once instead of lowering every line inside
+        # the loop — one allocation per file rather than one per line.
+        comparison_data = data.casefold() if is_case_insensitive else data
 
-        for line_num, line in enumerate(lines, 1):
-            # Remove trailing newline for comparison
-            line_content = line.rstrip('\n\r')
-            
-            # Determine if the line matches the pattern based on flags
-            line_matches = False
+        lines = data.split('\n')
+        comparison_lines = comparison_data.split('\n') if is_case_insensitive else lines
+        ends_with_newline = data.endswith('\n')
+        if lines and lines[-1] == '':
+            # A trailing newline terminates the last line rather than
+            # starting a new (empty) one.
+            lines.pop()
+            if is_case_insensitive:
+                comparison_lines = comparison_lines[:-1]
+        last_line_num = len(lines)
 
-            if is_match_entire_line:
-                # The entire line must match the pattern
-                comparison_line = line_content if not is_case_insensitive else line_content.lower()
-                line_matches = comparison_line == search_pattern
-            else:
-                # The pattern can match anywhere in the line
-                comparison_line = line_content if not is_case_insensitive else line_content.lower()
-                line_matches = search_pattern in comparison_line
-
-            # Apply invert flag
-            if is_invert_match:
-                line_matches = not line_matches
+        file_has_match = False  # Track if this file has any matches (for -l flag)
+        file_results = []       # Store results for this file if not using -l
 
-            if line_matches:
+        for line_num, (line, comparison_line) in enumerate(zip(lines, comparison_lines), 1):
+            # The split already removed the newline; only a stray '\r' remains
+            if matches(comparison_line.rstrip('\r')):
                 file_has_match = True
                 if not is_output_filenames_only:  # If -l flag is not set, add the line to results
                     output_parts = []
-                    
+
                     if prepend_filename:
                         output_parts.append(f"{file_name}:")
-                    
+
                     if is_prepend_line_numbers:
                         output_parts.append(f"{line_num}:")
-                    
+
                     # Add the original line content (with its original ending)
-                    output_parts.append(line)
-                    
+                    if line_num < last_line_num or ends_with_newline:
+                        output_parts.append(line + '\n')
+                    else:
+                        output_parts.append(line)
+
                     file_results.append("".join(output_parts))
 
         # After processing all lines in the file
@@ -76,5 +86,6 @@ def grep(pattern, flags, files):
             # Add lines collected for this file (if not using -l flag)
             results.extend(file_results)
 
-    # return results
-    return "\n".join(results) + ("\n" if results else "")
+    # Each entry already carries its own terminator, so a plain concatenation
+    # is both correct (no injected separators) and a single O(total) pass.
+    return "".join(results)
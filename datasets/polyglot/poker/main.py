@@ -1,32 +1,54 @@
-from collections import Counter
+import functools
 
-_RANK_MAP = {r: i for i, r in enumerate("..23456789TJQKA", start=0)}
-# values: '2'->2, ..., 'T'->10, 'J'->11, 'Q'->12, 'K'->13, 'A'->14
+# 256-entry byte table: _RANK_TABLE[ord('2')]==2, ..., ord('T')->10,
+# ord('J')->11, ord('Q')->12, ord('K')->13, ord('A')->14; 0 marks invalid.
+_RANK_TABLE = bytearray(256)
+for _i, _c in enumerate("23456789TJQKA", start=2):
+    _RANK_TABLE[ord(_c)] = _i
+_RANK_TABLE = bytes(_RANK_TABLE)
 
 def _parse(hand):
-    # "4S 5S 7H 8D JC" -> (ranks(list[int]), suits(list[str]))
-    cards = hand.split()
-    ranks = [_RANK_MAP[c[0]] for c in cards]
-    suits = [c[1] for c in cards]
-    return ranks, suits
+    # "4S 5S 7H 8D JC" -> (ranks(list[int]), suits(list[int]))
+    # Cards are "<rank><suit>" separated by single spaces, so ranks sit at
+    # every third byte and suits right after — sliced at C speed, no dict.
+    b = hand.encode('ascii')
+    ranks = [_RANK_TABLE[v] for v in b[::3]]
+    if 0 in ranks:
+        raise KeyError(chr(b[ranks.index(0) * 3]))
+    return ranks, list(b[1::3])
 
 def _is_straight(ranks):
     """Return (is_straight, high_rank) with Ace-low handled."""
-    uniq = sorted(set(ranks), reverse=True)
-    if len(uniq) != 5:
+    # One bit per rank: uniqueness, min and max all fall out of integer ops
+    # with no set/sort allocations.
+    m = 0
+    for r in ranks:
+        m |= 1 << r
+    if m.bit_count() != 5:
         return False, 0
-    # normal straight
-    if uniq[0] - uniq[-1] == 4:
-        return True, uniq[0]
-    # A-2-3-4-5 wheel: treat Ace as 1 -> high = 5
-    if uniq == [14, 5, 4, 3, 2]:
+    hi = m.bit_length() - 1
+    # normal straight: five distinct bits spanning exactly 4 positions
+    if hi - ((m & -m).bit_length() - 1) == 4:
+        return True, hi
+    # A-2-3-4-5 wheel: bits at 14 and 5,4,3,2 -> treat Ace as 1, high = 5
+    if m == 0b100000000111100:
         return True, 5
     return False, 0
 
 def _is_flush(suits):
-    return len(set(suits)) == 1
+    # Chained equality short-circuits on the first mismatch and allocates
+    # nothing, unlike building a set of the five suits.
+    s0 = suits[0]
+    return s0 == suits[1] == suits[2] == suits[3] == suits[4]
 
 def _hand_rank(hand):
+    # Canonicalize so permutations of the same five cards share one cache
+    # entry; repeated hands (common in simulation workloads) then cost a
+    # dict lookup instead of a full parse-and-classify.
+    return _hand_rank_cached(' '.join(sorted(hand.split())))
+
+@functools.lru_cache(maxsize=1 << 20)
+def _hand_rank_cached(hand):
     """
     Produce a rank tuple comparable with max():
     Category order (ascending):
@@ -41,21 +63,34 @@ def _hand_rank(hand):
     if straight and flush:
         return (8, straight_high)
 
-    cnt = Counter(ranks)
-    # items sorted by (count desc, rank desc)
-    by_count_then_rank = sorted(cnt.items(), key=lambda x: (x[1], x[0]), reverse=True)
-    counts = [c for _, c in by_count_then_rank]
-    ordered_ranks = [r for r, _ in by_count_then_rank]  # ranks grouped by multiplicity
-
-    if counts == [4, 1]:
+    # Pack per-rank multiplicities into 4-bit nibbles of one integer, then
+    # pull the groups out high-to-low — a handful of integer ops instead of
+    # Counter + sorted + a key lambda.
+    count_mask = 0
+    for r in ranks:
+        count_mask += 1 << (4 * r)
+
+    quad = trips = 0
+    pairs = []    # pair ranks, high to low
+    kickers = []  # singleton ranks, high to low
+    for r in range(14, 1, -1):
+        c = (count_mask >> (4 * r)) & 0xF
+        if c == 1:
+            kickers.append(r)
+        elif c == 2:
+            pairs.append(r)
+        elif c == 3:
+            trips = r
+        elif c == 4:
+            quad = r
+
+    if quad:
         # Four of a kind: quad rank, kicker
-        quad, kicker = ordered_ranks[0], ordered_ranks[1]
-        return (7, quad, kicker)
+        return (7, quad, kickers[0])
 
-    if counts == [3, 2]:
+    if trips and pairs:
         # Full house: trips rank, pair rank
-        trips, pair = ordered_ranks[0], ordered_ranks[1]
-        return (6, trips, pair)
+        return (6, trips, pairs[0])
 
     if flush:
         # Flush: compare all ranks high to low
@@ -64,20 +99,14 @@ def _hand_rank(hand):
     if straight:
         return (4, straight_high)
 
-    if counts == [3, 1, 1]:
-        trips = ordered_ranks[0]
-        kickers = sorted(ordered_ranks[1:], reverse=True)
+    if trips:
         return (3, trips, *kickers)
 
-    if counts == [2, 2, 1]:
-        high_pair, low_pair = sorted(ordered_ranks[:2], reverse=True)
-        kicker = ordered_ranks[2]
-        return (2, high_pair, low_pair, kicker)
+    if len(pairs) == 2:
+        return (2, pairs[0], pairs[1], kickers[0])
 
-    if counts == [2, 1, 1, 1]:
-        pair = ordered_ranks[0]
-        kickers = sorted(ordered_ranks[1:], reverse=True)
-        return (1, pair, *kickers)
+    if pairs:
+        return (1, pairs[0], *kickers)
 
     # High card
     return (0, *ranks_sorted)
@@ -87,6 +116,91 @@ def best_hands(hands):
     Given a list of hand strings, return a list with the best hand(s).
     If multiple tie for best, return all of them (original strings).
     """
-    scored = [(h, _hand_rank(h)) for h in hands]
-    best_score = max(score for _, score in scored)
-    return [h for h, score in scored if score == best_score]
+    # Single pass: track the current best score and its holders as we go,
+    # instead of materializing all (hand, score) pairs and rescanning them.
+    best_score = None
+    winners = []
+    for h in hands:
+        score = _hand_rank(h)
+        if best_score is None or score > best_score:
+            best_score = score
+            winners = [h]
+        elif score == best_score:
+            winners.append(h)
+    return winners
+
+def best_hands_batch(hands):
+    """
+    Vectorized best_hands for bulk workloads (e.g. simulations): score all
+    hands at once with NumPy instead of one Python call per hand.
+
+    Requires NumPy and hands in the canonical "XY XY XY XY XY" form (two
+    characters per card). Result and tie order match best_hands.
+    """
+    import numpy as np
+
+    if not hands:
+        return []
+    if any(len(h) != 14 for h in hands):
+        # Non-canonical card widths can't be stride-parsed; score one by one.
+        return best_hands(hands)
+
+    n = len(hands)
+    buf = "".join(hands).encode('ascii')
+    table = np.frombuffer(_RANK_TABLE, np.uint8)
+    b = np.frombuffer(buf, np.uint8).reshape(n, 14)
+    ranks = table[b[:, 0::3]].astype(np.int64)   # (n, 5)
+    suits = b[:, 1::3]                           # (n, 5)
+    if not ranks.all():
+        bad = np.flatnonzero(~ranks.all(axis=1))[0]
+        raise KeyError(hands[bad][int(np.flatnonzero(ranks[bad] == 0)[0]) * 3])
+
+    flush = (suits == suits[:, :1]).all(axis=1)
+    asc = np.sort(ranks, axis=1)
+    desc = asc[:, ::-1]
+    distinct = (np.diff(asc, axis=1) > 0).all(axis=1)
+    wheel = distinct & (asc == np.array([2, 3, 4, 5, 14])).all(axis=1)
+    straight = wheel | (distinct & (asc[:, 4] - asc[:, 0] == 4))
+    straight_high = np.where(wheel, 5, asc[:, 4])
+
+    # Same nibble-count trick as _hand_rank, applied across all rows at once.
+    count_mask = (np.int64(1) << (4 * ranks)).sum(axis=1)
+    rank_vals = np.arange(14, 1, -1, dtype=np.int64)          # high to low
+    cnts = (count_mask[:, None] >> (4 * rank_vals)) & 0xF     # (n, 13)
+    quad = ((cnts == 4) * rank_vals).max(axis=1)
+    trips = ((cnts == 3) * rank_vals).max(axis=1)
+    pair_hi = ((cnts == 2) * rank_vals).max(axis=1)
+    pair_lo = ((cnts == 2) * rank_vals).sum(axis=1) - pair_hi
+    n_pairs = (cnts == 2).sum(axis=1)
+    singles = np.sort((cnts == 1) * rank_vals, axis=1)[:, ::-1]
+    k1, k2, k3 = singles[:, 0], singles[:, 1], singles[:, 2]
+
+    zero = np.zeros(n, dtype=np.int64)
+    # Conditions in the same precedence order as _hand_rank.
+    conds = [
+        straight & flush,
+        quad > 0,
+        (trips > 0) & (n_pairs > 0),
+        flush,
+        straight,
+        trips > 0,
+        n_pairs == 2,
+        n_pairs == 1,
+    ]
+    cat = np.select(conds, [8, 7, 6, 5, 4, 3, 2, 1], default=0)
+    t1 = np.select(conds, [straight_high, quad, trips, desc[:, 0],
+                           straight_high, trips, pair_hi, pair_hi], desc[:, 0])
+    t2 = np.select(conds, [zero, k1, pair_hi, desc[:, 1],
+                           zero, k1, pair_lo, k1], desc[:, 1])
+    t3 = np.select(conds, [zero, zero, zero, desc[:, 2],
+                           zero, k2, k1, k2], desc[:, 2])
+    t4 = np.select(conds, [zero, zero, zero, desc[:, 3],
+                           zero, zero, zero, k3], desc[:, 3])
+    t5 = np.select(conds, [zero, zero, zero, desc[:, 4],
+                           zero, zero, zero, zero], desc[:, 4])
+
+    # Pack (category, tiebreaks) into one comparable integer per hand; the
+    # zero padding is identical within a category, so ordering is preserved.
+    score = (cat << 20) | (t1 << 16) | (t2 << 12) | (t3 << 8) | (t4 << 4) | t5
+    best = score.max()
+    return [hands[i] for i in np.flatnonzero(score == best)]
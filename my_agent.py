@@ -1,19 +1,25 @@
 from __future__ import annotations
 import ast
-import asyncio
+import atexit
+import bisect
+import copy
+import functools
 import glob
 import io
 import json
-import math
+import hashlib
 import os
-import tokenize
-import aiohttp
-import requests
+import pickle
+import shlex
+import shutil
+import stat
+import sys
 import subprocess
-import ast, sys
-import textwrap
+import tempfile
+import threading
 import time
 import traceback
+import types
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 from json import JSONDecodeError
@@ -21,12 +27,26 @@ import re
 import inspect
 import random
 from enum import Enum
-import json
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import csv
 import logging
+import mmap
 from uuid import uuid4
 
-from tqdm import tqdm
+try:
+    import orjson
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+    # Bytes variant for wire payloads: skips the decode-then-re-encode
+    # round-trip a str body would pay inside requests.
+    _dumps_bytes = orjson.dumps
+    _loads = orjson.loads
+except ImportError:  # orjson is optional; fall back to the stdlib codec
+    _dumps = functools.partial(json.dumps, ensure_ascii=False)
+    def _dumps_bytes(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False).encode()
+    _loads = json.loads
 
 PROBLEM_TYPE_CREATE = "CREATE"
 PROBLEM_TYPE_FIX = "FIX"
@@ -38,23 +58,94 @@ GLM_MODEL_NAME = "zai-org/GLM-4.6-FP8"
 KIMI_MODEL_NAME = "moonshotai/Kimi-K2-Instruct"
 DEEPSEEK_MODEL_NAME = "deepseek-ai/DeepSeek-V3-0324"
 QWEN_MODEL_NAME = "Qwen/Qwen3-Coder-480B-A35B-Instruct-FP8"
-AGENT_MODELS=[GLM_MODEL_NAME, KIMI_MODEL_NAME, DEEPSEEK_MODEL_NAME, QWEN_MODEL_NAME]
+AGENT_MODELS=(GLM_MODEL_NAME, KIMI_MODEL_NAME, DEEPSEEK_MODEL_NAME, QWEN_MODEL_NAME)
+# model -> position, so the retry rotation resolves its starting point with
+# one dict hit instead of a tuple scan per attempt.
+_MODEL_INDEX = {m: i for i, m in enumerate(AGENT_MODELS)}
+
 MAX_FIX_TASK_STEPS = 100
 
-PYTEST_COMMAND_TEMPLATE = textwrap.dedent("""\
-python -c "import sys, pytest, collections, collections.abc, urllib3.exceptions, _pytest.pytester;
-collections.Mapping = collections.abc.Mapping;
-collections.MutableMapping = collections.abc.MutableMapping;
-collections.MutableSet = collections.abc.MutableSet;
-collections.Sequence = collections.abc.Sequence;
-collections.Callable = collections.abc.Callable;
-urllib3.exceptions.SNIMissingWarning = urllib3.exceptions.DependencyWarning;
-pytest.RemovedInPytest4Warning = DeprecationWarning;
-_pytest.pytester.Testdir = _pytest.pytester.Pytester;
-sys.exit(pytest.main([{file_paths}, '-v']))"\
-""")
-
-AVAILABLE_INSTANCE_TYPES = {
+# The compat monkeypatches and pytest.main call live in a real module so the
+# interpreter loads cached bytecode instead of recompiling a -c one-liner on
+# every test run. The agent deploys as a single file, so the module source
+# is embedded here and materialized to a temp file on first use.
+_PYTEST_SHIM_SOURCE = '''\
+"""Run pytest once over the files given on the command line."""
+import os
+import sys
+
+
+def main(argv):
+    # `python -c` runs with the working directory on sys.path; mirror that so
+    # tests in the repository under test can import their local modules.
+    sys.path.insert(0, os.getcwd())
+
+    import collections
+    import collections.abc
+    import urllib3.exceptions
+    import pytest
+    import _pytest.pytester
+
+    # Aliases that older test suites expect from modern stdlib/pytest.
+    collections.Mapping = collections.abc.Mapping
+    collections.MutableMapping = collections.abc.MutableMapping
+    collections.MutableSet = collections.abc.MutableSet
+    collections.Sequence = collections.abc.Sequence
+    collections.Callable = collections.abc.Callable
+    urllib3.exceptions.SNIMissingWarning = urllib3.exceptions.DependencyWarning
+    pytest.RemovedInPytest4Warning = DeprecationWarning
+    _pytest.pytester.Testdir = _pytest.pytester.Pytester
+
+    return pytest.main(list(argv) + ["-v", "-p", "no:cacheprovider"])
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
+'''
+
+_pytest_shim_path: str | None = None
+
+def _pytest_shim() -> str:
+    '''Write the embedded shim module out once per process (absolute path,
+    since test tools chdir around) and reuse it for every test run.'''
+    global _pytest_shim_path
+    if _pytest_shim_path is None:
+        fd, path = tempfile.mkstemp(prefix="pytest_shim_", suffix=".py")
+        with os.fdopen(fd, "w") as f:
+            f.write(_PYTEST_SHIM_SOURCE)
+        _pytest_shim_path = path
+    return _pytest_shim_path
+
+def _run_pytest_batch(files: list[str], timeout: int) -> tuple[int, str]:
+    result = subprocess.run(
+        [sys.executable, _pytest_shim(), *files],
+        capture_output=True, text=True, timeout=timeout,
+    )
+    return result.returncode, (result.stdout or "") + (result.stderr or "")
+
+def run_tests(files: list[str], timeout: int = 60) -> tuple[int, str]:
+    '''
+    Run pytest over the given files: interpreter startup and plugin
+    discovery are paid once per shard instead of once per file, and the
+    shim passes no:cacheprovider to skip .pytest_cache writes.
+
+    Multi-file runs are sharded across a small pool of concurrent pytest
+    processes, so wall-clock cost is the slowest shard rather than the sum.
+    The concatenated output contains one session per shard, which the
+    meta-session branch of analyze_pytest_output already understands.
+    Returns (returncode, output).
+    '''
+    workers = min(max((os.cpu_count() or 2) - 2, 1), len(files) or 1)
+    if workers <= 1:
+        return _run_pytest_batch(files, timeout)
+    # Round-robin keeps shard sizes even when file costs are skewed by
+    # position (e.g. callers sort test files by size).
+    shards = [files[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda shard: _run_pytest_batch(shard, timeout), shards))
+    return max(rc for rc, _ in results), "\n".join(out for _, out in results)
+
+AVAILABLE_INSTANCE_TYPES = types.MappingProxyType({
     "list": list,
     "dict": dict,
     "str": str,
@@ -66,7 +157,7 @@ AVAILABLE_INSTANCE_TYPES = {
     "NoneType": type(None),
     "varargs": "varargs",  # Special string identifier for *args
     "kwargs": "kwargs",    # Special string identifier for **kwargs
-}
+})
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -81,7 +172,7 @@ stream_handler.setLevel(logging.DEBUG)
 stream_handler.setFormatter(formatter)
 logger.addHandler(stream_handler)
 
-PROBLEM_TYPE_CHECK_PROMPT = textwrap.dedent("""
+PROBLEM_TYPE_CHECK_PROMPT = """
 <role>
 You are a problem type classifier. Analyze the problem statement to understand its fundamental nature and intent.
 </role>
@@ -130,18 +221,23 @@ Analyze the problem statement holistically, considering context, intent, and sco
 <output>
 Only respond with "FIX" or "CREATE".
 </output>
-""")
+"""
 
-DO_NOT_REPEAT_TOOL_CALLS=textwrap.dedent("""
+DO_NOT_REPEAT_TOOL_CALLS="""
 You're not allowed to repeat the same tool call with the same arguments.
 Your previous response: 
 {previous_response}
 
 Try to use something different!
-""")
-
-INFINITE_LOOP_CHECK_PROMPT = textwrap.dedent(
 """
+
+@functools.lru_cache(maxsize=16)
+def _dont_repeat(previous_response: str) -> str:
+    # A stuck agent tends to re-trigger the same reminder for several steps;
+    # cache the rendered template per distinct previous response.
+    return DO_NOT_REPEAT_TOOL_CALLS.format(previous_response=previous_response)
+
+INFINITE_LOOP_CHECK_PROMPT = """
 You are an expert code reviewer specializing in infinite loop detection and prevention. Your task is to analyze the generated Python code for potential infinite loops and provide a corrected version if issues are found.
 
 CRITICAL INFINITE LOOP DETECTION:
@@ -170,9 +266,8 @@ b.py
 contents of b.py
 ```
 """
-)
 
-GENERATE_INITIAL_TESTCASES_PROMPT = textwrap.dedent("""
+GENERATE_INITIAL_TESTCASES_PROMPT = """
 You are an expert Python testcase developer. Your task is to generate a complete testcases for the given problem statement.
 
 Important things:
@@ -197,10 +292,8 @@ test_b.py
 contents of test_b.py
 ```
 """
-)
 
-GENERATE_SOLUTION_WITH_MULTI_STEP_REASONING_PROMPT = textwrap.dedent(
-"""
+GENERATE_SOLUTION_WITH_MULTI_STEP_REASONING_PROMPT = """
 You are an expert Python developer. Your task is to generate a complete, working Python solution for the given problem statement.
 
 Strict Requirements:
@@ -228,9 +321,7 @@ b.py
 {content}
 ```
 """
-)
-GENERATE_TESTCASES_WITH_MULTI_STEP_REASONING_PROMPT = textwrap.dedent(
-"""
+GENERATE_TESTCASES_WITH_MULTI_STEP_REASONING_PROMPT = """
 You are an expert Python testcase developer. Your task is to generate a complete testcases for the given problem statement.
 
 Important things:
@@ -255,11 +346,9 @@ test_b.py
 contents of test_b.py
 ```
 """
-)
 
 
-FUNCTION_METADATA_GENERATION_SYSTEM_PROMPT = textwrap.dedent(
-'''
+FUNCTION_METADATA_GENERATION_SYSTEM_PROMPT = '''
 You are the function description generator from the given instruction and code skeleton.
 Your role is to generate detailed descriptions for all functions or methods by following these steps:
 - Understand the instruction completely
@@ -406,9 +495,8 @@ You should respond in json format
     }
 ]
 '''
-)
 
-GENERATE_INITIAL_SOLUTION_PROMPT = textwrap.dedent("""
+GENERATE_INITIAL_SOLUTION_PROMPT = """
 You are an expert Python developer. Your task is to generate a complete, working Python solution for the given problem statement.
 
 Strict Requirements:
@@ -436,10 +524,8 @@ b.py
 {content}
 ```
 """
-)
 
-TESTCASES_CHECK_PROMPT = textwrap.dedent(
-"""
+TESTCASES_CHECK_PROMPT = """
 You are an expert testcases reviewer specializing in invalid testcases detection and prevention. Your task is to analyze the generated test code if it's all valid for the problem statement.
 
 Important:
@@ -463,9 +549,8 @@ test_b.py
 contents of test_b.py
 ```
 """
-)
 
-CREATE_TASK_SYSTEM_PROMPT = textwrap.dedent("""
+CREATE_TASK_SYSTEM_PROMPT = """
 # Hey there! You're a Coding Assistant 🚀. I have uploaded all files of a python repository. Your current working directory is at the root of that repo. You will be provided with a problem statement and you need to make the necessary changes to fix the issue.
 
 ## Follow these steps to fix the issue:
@@ -500,9 +585,9 @@ You have access to the following tools:-
 {tools_docs}
 
 {format_prompt}
-""")
+"""
 
-FIX_TASK_SYSTEM_PROMPT = textwrap.dedent("""
+FIX_TASK_SYSTEM_PROMPT = """
 # Hey there! You're a Coding Assistant 🚀. I have uploaded all files of a python repository. Your current working directory is at the root of that repo. You will be provided with a problem statement and you need to make the necessary changes to fix the issue.
 Always think what step you are in and what you need to do next.
 
@@ -515,7 +600,7 @@ Always think what step you are in and what you need to do next.
       - Keep searching the repository after each match to find all relevant files
     </rules>
   </step>
-  
+
   <step number="2">
     <description>Localise the code causing the issue</description>
     <rules>
@@ -523,7 +608,7 @@ Always think what step you are in and what you need to do next.
       - Iterate until no applicable occurrences remain
     </rules>
   </step>
-  
+
   <step number="3">
     <description>Propose at least 2 meaningfully different and accurate solutions</description>
     <rules>
@@ -534,7 +619,7 @@ Always think what step you are in and what you need to do next.
       - Each solution must be very detailed and explain why they are better than the other solutions
     </rules>
   </step>
-  
+
   <step number="4">
     <description>Get approval for your proposed solution</description>
     <rules>
@@ -543,7 +628,7 @@ Always think what step you are in and what you need to do next.
       - Explain the reason for selecting that solution over other solutions
     </rules>
   </step>
-  
+
   <step number="5">
     <description>Edit the sourcecode of the repo to resolve the issue</description>
     <rules>
@@ -553,7 +638,7 @@ Always think what step you are in and what you need to do next.
       - Do not create any new files or directories unless absolutely necessary for the fix
     </rules>
   </step>
-  
+
   <step number="6">
     <description>Think about edge cases and ensure the fix handles them</description>
     <rules>
@@ -561,7 +646,7 @@ Always think what step you are in and what you need to do next.
       - Test your fix mentally against various edge cases before implementing
     </rules>
   </step>
-  
+
   <step number="7">
     <description>Validate your changes don't break existing functionality</description>
     <rules>
@@ -592,45 +677,45 @@ You have access to the following tools:-
 {tools_docs}
 
 {format_prompt}
-""")
+"""
 
 
-FIX_TASK_INSTANCE_PROMPT_TEMPLATE = textwrap.dedent("""
+FIX_TASK_INSTANCE_PROMPT_TEMPLATE = """
 # Now let's start. Here is the problem statement:
 {problem_statement}
 # Here are the tests that are most likely to be relevant to the problem:
 {test_func_names}                                   
-""")
+"""
 
-CREATE_TASK_INSTANCE_PROMPT_TEMPLATE = textwrap.dedent("""
+CREATE_TASK_INSTANCE_PROMPT_TEMPLATE = """
 # Now let's start. Here is the problem statement:
 {problem_statement}
-""")
-FIND_TEST_RUNNER_PROMPT = textwrap.dedent("""\
+"""
+FIND_TEST_RUNNER_PROMPT = """\
 You are a helpful assistant that can find the test runner for a given repository.
 - The test runner is the file that can run the individual test files and test cases. (e.g. pytest, unittest, etc.)
 - Do not use the test runner to run test for whole repository or test setup.
 - Read the README file and find the test runner. If there is no test runner, return pytest.
 - Output format should be as the following. No other texts are allowed.
 abc/test.py
-""")
+"""
 
-TEST_RUNNER_MODE_PROMPT = textwrap.dedent("""\
+TEST_RUNNER_MODE_PROMPT = """\
 You are a helpful assistant that determines the mode of the test runner.
 Read the test runner file and determine if it requires a module or a file path to run the test.
 Output should be one of MODULE or FILE, No other texts are allowed.
 - MODULE: When the test runner requires a module path to run the test.
 - FILE: When the test runner requires a file path to run the test (e.g. pytest, unittest, py.test, etc.).
-""")
+"""
 
 
-STOP_INSTRUCTION=textwrap.dedent("""
+STOP_INSTRUCTION="""
 # 🎨 
 DO NOT generate `observation:` in your response. It will be provided by user for you.
 Generate only SINGLE triplet of `next_thought`, `next_tool_name`, `next_tool_args` in your response.
-""")
+"""
 
-FORMAT_PROMPT_V0=textwrap.dedent("""
+FORMAT_PROMPT_V0="""
 **📝 Response Format Requirements**
 
 1. **Strict Triplet Format**:
@@ -667,106 +752,352 @@ FORMAT_PROMPT_V0=textwrap.dedent("""
    - Extra text outside the triplet format
    - Using incorrect tool names
    - Not quoting special characters properly
-""")
+"""
 
 run_id=None
-  
+# Stable fallback id so requests made before run_id is assigned still share
+# one identity instead of minting a fresh uuid per call.
+_FALLBACK_RUN_ID = str(uuid4())
+
+_http_session: Optional[requests.Session] = None
+
+def get_http_session() -> requests.Session:
+    # One shared session keeps the LLM-proxy connection alive across steps,
+    # so each request reuses the pooled socket instead of paying a fresh
+    # TCP (and DNS) setup. requests is imported here, not at module top,
+    # so cold starts that never reach the network skip its import cost.
+    import requests
+    global _http_session
+    if _http_session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=64)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _http_session = session
+    return _http_session
+
+@atexit.register
+def _close_http_session() -> None:
+    if _http_session is not None:
+        _http_session.close()
+
+_failed_fh = None
+_failed_writer = None
+_failed_rows = 0
+_failed_lock = threading.Lock()
+
+def _get_failed_writer() -> csv.writer:
+    # One lazily opened append handle shared by every failure, instead of an
+    # open()+close() syscall pair and a fresh csv.writer per logged row.
+    global _failed_fh, _failed_writer
+    if _failed_writer is None:
+        _failed_fh = open("../failed_messages.csv", "a", buffering=1 << 16, newline="")
+        _failed_writer = csv.writer(_failed_fh)
+        atexit.register(_failed_fh.close)
+    return _failed_writer
+
+def render_prompt(parts: list[str]) -> str:
+    # Buffered single-pass assembly: appending to a list and writing it out
+    # once stays linear where repeated str += would go quadratic.
+    buf = io.StringIO()
+    buf.writelines(parts)
+    return buf.getvalue()
+
+@functools.lru_cache(maxsize=8)
+def _system_prompt_parts(template: str) -> tuple[str, str, str]:
+    # Split on the two placeholders once per template so rendering is plain
+    # concatenation instead of re-parsing a multi-KB format string.
+    head, rest = template.split("{tools_docs}")
+    middle, tail = rest.split("{format_prompt}")
+    return head, middle, tail
+
+def render_system_prompt(template: str, tools_docs: str, format_prompt: str) -> str:
+    head, middle, tail = _system_prompt_parts(template)
+    return render_prompt([head, tools_docs, middle, format_prompt, tail])
+
+# Fixed patterns used by the response/pytest parsing paths, compiled once at
+# import instead of on every call.
+_RESP_KEY_RE = re.compile(r"['\"]*(next_thought|next_tool_name|next_tool_args|observation)['\"]*:")
+_SESSION_START_RE = re.compile(r'={5,}\s*test session starts\s*={5,}', re.IGNORECASE)
+_SHORT_SUMMARY_RE = re.compile(r'={5,}\s*short test summary info\s*={5,}', re.IGNORECASE)
+_SECTION_HEADER_RE = re.compile(r'={5,}.*?={5,}', re.IGNORECASE)
+_SUMMARY_LINE_RE = re.compile(r'={3,}.*?\b\d+\.\d+s\s*(\([^)]+\))?\s*={3,}', re.IGNORECASE)
+_RESULT_COUNT_RE = re.compile(r'(\d+)\s+(\w+)')
+_FAILURES_HEADER_RE = re.compile(r'={5,}\s*FAILURES\s*={5,}', re.IGNORECASE)
+_ERRORS_HEADER_RE = re.compile(r'={5,}\s*ERRORS\s*={5,}', re.IGNORECASE)
+_WARNINGS_HEADER_RE = re.compile(r'={5,}\s*warnings summary\s*={5,}', re.IGNORECASE)
+_FAILURE_SEPARATOR_RE = re.compile(r'_{5,}\s+(.+?)\s+_{5,}')
+_TEST_NAME_RE = re.compile(r'^([^:]+::[^:\s]+(?:::[^:\s]+)?)')
+_ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;]*m')
+_FAILED_LINE_RE = re.compile(r'FAILED[^\S\n]+(\S+)')
+# Dependency-error signatures folded into one case-insensitive alternation:
+# a single scan of the output instead of ~25 (the literal list also carried
+# several duplicates), and no full lowercased copy of the output.
+_DEP_ERROR_SIGNATURES = (
+    "ModuleNotFoundError",
+    "No module named",
+    "missing module named",
+    "missing dependency",
+    "ImportError",
+    "Failed to import",
+    "Could not import",
+    "cannot import",
+    "cannot open shared object file",
+    "undefined symbol",
+    "bad magic number",
+    "incompatible library",
+    "pkg_resources.DistributionNotFound",
+    "pkg_resources.VersionConflict",
+    "INTERNALERROR",
+    "Could not find a version that satisfies the requirement",
+    "ERROR: No matching distribution found for",
+    "not configured",
+)
+_DEP_ERROR_RE = re.compile(
+    "|".join(re.escape(sig) for sig in _DEP_ERROR_SIGNATURES), re.IGNORECASE
+)
+_TEXT_BLOCK_RE = re.compile(r'```text\n(.*?)\n```', re.DOTALL)
+_BEST_SOLUTION_RE = re.compile(r'BEST_SOLUTION:\s*(\d+)')
+_BEST_TESTCASE_RE = re.compile(r'BEST_TESTCASE:\s*(\d+)')
+_CONFIDENCE_RE = re.compile(r'CONFIDENCE:\s*(\w+)')
+_SOLUTION_SPLIT_RE = re.compile(r"(Solution \d+:)")
+_TEST_FUNC_DEF_RE = re.compile(r'^\s*def\s+test_\w+', re.MULTILINE)
+_PARAM_DOC_RE = re.compile(r"(\w+):([^\n]+)")
+_STRIP_QUOTES_RE = re.compile(r'^[\s\'"]+|[\s\'"]+$')
+
+def _mstrip(s: str) -> str:
+    # Single-pass strip of surrounding whitespace and quotes; the chained
+    # .strip().strip("'")... form allocates a new string per link.
+    return _STRIP_QUOTES_RE.sub("", s)
+
+# Directory names the project-wide search never descends into: VCS metadata,
+# docs, virtualenvs and other vendored/derived trees.
+_SKIP_WALK_DIRS = frozenset({
+    ".git", "docs", ".venv", "venv", "node_modules", "build", "dist",
+    "__pycache__", ".tox", ".mypy_cache", ".pytest_cache", "site-packages",
+})
+
+@functools.lru_cache(maxsize=64)
+def _command_argv(cmd: str) -> tuple:
+    '''
+    shlex.split memoized per command string (the agent re-runs the same few
+    runner commands in a tight loop). Returns () when the command needs real
+    shell interpretation — operators, globs like tests/test_*.py, or ~
+    expansion — and must keep going through /bin/sh.
+    '''
+    if any(tok in cmd for tok in ("|", "&&", "||", ";", "$(", "`", ">", "<", "*", "?", "[", "~")):
+        return ()
+    return tuple(shlex.split(cmd))
+
+def _run_test_command(cmd: str, timeout: int) -> subprocess.CompletedProcess:
+    '''
+    Run a test-runner command line, skipping the /bin/sh fork when the
+    command has no shell metacharacters (the common case).
+    '''
+    argv = _command_argv(cmd)
+    if argv:
+        return subprocess.run(list(argv), capture_output=True, text=True, timeout=timeout)
+    return subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout)
+
+def _cap_output(out: str, limit: int = 20000) -> str:
+    '''
+    Bound test-runner output to roughly `limit` characters before any
+    splitlines/regex parsing touches it, so downstream work is independent
+    of how much the suite printed. Keeps the head (session header, early
+    import errors) and the tail (FAILURES and short-summary sections, both
+    near the end) and drops the middle.
+    '''
+    if len(out) <= limit:
+        return out
+    tail_start = out.rfind('\n', 0, len(out) - 5000)
+    if tail_start == -1:
+        tail_start = len(out) - 5000
+    return out[:15000] + "\n...TRUNCATED...\n" + out[tail_start:]
+
+def _grep_candidate_files(search_term: str, case_sensitive: bool):
+    '''
+    Prefilter the repository for files whose contents may match search_term,
+    using ripgrep or grep (memory-mapped, SIMD-accelerated scans) so Python
+    only reads and parses candidate files. Returns a set of normalized
+    paths, or None when no external searcher could run — callers then fall
+    back to checking every file themselves.
+    '''
+    commands = [
+        ["rg", "-l", "--type", "py", "-e", search_term, "."],
+        ["grep", "-rlE", "--include=*.py", "-e", search_term, "."],
+    ]
+    for command in commands:
+        if not case_sensitive:
+            command = command[:1] + ["-i"] + command[1:]
+        try:
+            proc = subprocess.run(command, capture_output=True, text=True, timeout=60)
+        except (FileNotFoundError, subprocess.TimeoutExpired, OSError):
+            continue
+        # 0 = matches, 1 = clean no-match; anything else (e.g. a pattern the
+        # tool's regex dialect rejects) means the filter is unusable.
+        if proc.returncode in (0, 1):
+            return {os.path.normpath(p) for p in proc.stdout.splitlines()}
+    return None
+
+def _compact(obs, limit: int = 8192):
+    '''
+    Bound an observation to `limit` characters, keeping head and tail around
+    an elision marker. Actions live for the whole trajectory via cot.thoughts,
+    so an uncapped multi-megabyte tool output would be re-rendered into every
+    subsequent prompt and retained until the run ends.
+    '''
+    s = ";".join(obs) if isinstance(obs, list) else obs
+    if not isinstance(s, str) or len(s) <= limit:
+        return s
+    half = limit // 2
+    return s[:half] + f"\n…[{len(s) - limit} chars elided]…\n" + s[-half:]
+
+def _dump_args(args) -> str:
+    # Compact JSON for tool args in prompts: no separator padding and no
+    # ASCII escaping, so the serialized dict costs fewer prompt tokens than
+    # its repr while staying loadable by Utils.load_json.
+    try:
+        return json.dumps(args, separators=(",", ":"), ensure_ascii=False, default=str)
+    except (TypeError, ValueError):
+        return str(args)
+
 class EnhancedCOT:
     class Action:
-            
+        # One Action per step, up to MAX_FIX_TASK_STEPS per task: slots drop
+        # the per-instance __dict__ and make the hot attribute reads in
+        # to_str() C-level slot lookups.
+        __slots__ = ("next_thought", "next_tool_name", "next_tool_args", "observation",
+                     "is_error", "raw_response", "total_attempts",
+                     "inference_error_counter", "request_data", "is_deleted", "_key",
+                     "_obs_rendered")
+
         def __init__(self, next_thought: str, next_tool_name: str, next_tool_args: dict, observation: list|tuple|str,is_error:bool=False,raw_response:str=None,total_attempts:int=0,inference_error_counter:dict=None,request_data:list=None):
             self.next_thought=next_thought
-            self.next_tool_name=next_tool_name
+            # Tool names and error-counter keys come from small fixed sets but
+            # recur on every step; interning hash-conses them so 100 steps
+            # share one copy apiece and compare by pointer in dict/set keys.
+            self.next_tool_name=sys.intern(next_tool_name) if isinstance(next_tool_name,str) else next_tool_name
             self.next_tool_args=next_tool_args
-            self.observation=";".join(observation) if isinstance(observation,list) else observation
+            if isinstance(observation,list):
+                if all(isinstance(o,str) and len(o)<=256 for o in observation):
+                    observation=";".join(map(sys.intern,observation))
+                else:
+                    observation=";".join(observation)
+            self.observation=_compact(observation)
             self.is_error=is_error
             self.raw_response=raw_response
             self.total_attempts=total_attempts
+            if isinstance(inference_error_counter,dict):
+                inference_error_counter={sys.intern(k):v for k,v in inference_error_counter.items()}
             self.inference_error_counter=inference_error_counter
             self.request_data=request_data
             self.is_deleted=False
+            # JSON rendering of a sequence observation, filled on first
+            # to_str() and reused on every later history serialization.
+            self._obs_rendered=None
     def __init__(self,latest_observations_to_keep=5):
         self.thoughts: list[EnhancedCOT.Action] = []
         self.latest_observations_to_keep=latest_observations_to_keep
+        self._seen_keys: set[tuple] = set()
+        # Bounded view of the newest actions: O(1) tail access for the
+        # repeat check and prompt assembly without slicing the archive.
+        self._recent: deque[EnhancedCOT.Action] = deque(maxlen=latest_observations_to_keep)
 
     def add_action(self, action: EnhancedCOT.Action) -> bool: # don't add if thought is repeated
-        logger.info(f"Adding action: tool={action.next_tool_name}, thought_length={len(action.next_thought) if action.next_thought else 0}, observation_length={len(str(action.observation)) if action.observation else 0}")
-        if action.observation:
-            logger.info(f"Observation: {str(action.observation)[:200]}{'...' if len(str(action.observation)) > 200 else ''}")
+        if logger.isEnabledFor(logging.INFO):
+            # Stringifying a large observation just for the log is the
+            # expensive part; skip it entirely when INFO is filtered out.
+            obs_str = str(action.observation) if action.observation else ''
+            logger.info('Adding action: tool=%s, thought_length=%s, observation_length=%s', action.next_tool_name, len(action.next_thought) if action.next_thought else 0, len(obs_str))
+            if obs_str:
+                logger.info('Observation: %s%s', obs_str[:200], '...' if len(obs_str) > 200 else '')
+        # Detect exact repeats of a prior step via a set lookup instead of
+        # scanning self.thoughts, which would go quadratic over a long
+        # trajectory. The action is appended either way: repeats must stay
+        # in the trajectory so is_thought_repeated() sees them and the
+        # workflow can inject its do-not-repeat reminder.
+        try:
+            args_key = json.dumps(action.next_tool_args, sort_keys=True, separators=(",", ":"), default=str)
+        except (TypeError, ValueError):
+            args_key = str(action.next_tool_args)
+        action._key = (action.next_tool_name, args_key, action.next_thought)
+        is_new = action._key not in self._seen_keys
+        self._seen_keys.add(action._key)
         self.thoughts.append(action)
-        return True
+        self._recent.append(action)
+        return is_new
         
     def is_thought_repeated(self)->bool:
         # Check if the last thought is the same as the previous thought.
         # If there are less than 2 thoughts, skip (return False).
-        if len(self.thoughts) < 2:
+        if len(self._recent) < 2:
             return False
-        last = self.thoughts[-1]
-        prev = self.thoughts[-2]
+        last = self._recent[-1]
+        prev = self._recent[-2]
         if last.next_tool_name == prev.next_tool_name and last.next_tool_args == prev.next_tool_args:
             return True
         return False
     def to_str(self):
         messages=[]
-        for i,thought in enumerate(self.thoughts):
-            if thought.is_deleted:
-                continue
-            if i<len(self.thoughts)-self.latest_observations_to_keep:
-                assistant_str = (
-                    f"next_thought:{thought.next_thought}\n"
-                    f"next_tool_name:{thought.next_tool_name}\n"
-                    f"next_tool_args:{thought.next_tool_args}\n"
-                )
-                # Compute observation summary length safely for str/list/None
-                if thought.observation is None:
+        # Filter deleted steps once so the loop body stays branch-free and,
+        # more importantly, the keep-latest window counts K live
+        # observations rather than K slots of a sparse list.
+        thoughts=[t for t in self.thoughts if not t.is_deleted]
+        n_thoughts=len(thoughts)
+        summary_cutoff=n_thoughts-self.latest_observations_to_keep
+        last_idx=n_thoughts-1
+        last_is_error=thoughts[-1].is_error if thoughts else None
+        dump_args=_dump_args
+        for i,thought in enumerate(thoughts):
+            # Stringify the observation at most once per thought and assemble
+            # the assistant block from parts instead of re-formatting the same
+            # three fields in every branch.
+            obs=thought.observation
+            obs_is_seq=isinstance(obs,(list,tuple))
+            obs_str=None
+            assistant_str="".join((
+                "next_thought:",str(thought.next_thought),
+                "\nnext_tool_name:",str(thought.next_tool_name),
+                "\nnext_tool_args:",dump_args(thought.next_tool_args),
+            ))
+            if i<summary_cutoff or (thought.is_error is not None and i!=last_idx and last_is_error==None):
+                # Older steps (and error steps once the run has recovered)
+                # collapse to a one-line summary; str.count avoids
+                # materializing a splitlines list just for the count.
+                if obs is None:
                     _obs_len = 0
-                elif isinstance(thought.observation, (list, tuple)):
-                    _obs_len = len(thought.observation)
+                elif obs_is_seq:
+                    _obs_len = len(obs)
                 else:
-                    _obs_len = len(str(thought.observation).splitlines())
-                user_str=( f"observation: {'error ocurred.' if thought.is_error else ''} "
-                    f"output omitted ({_obs_len}) lines\n")
-                
+                    obs_str = str(obs)
+                    _obs_len = obs_str.count("\n") + 1
+                if i<summary_cutoff:
+                    assistant_str+="\n"
+                    user_str=( f"observation: {'error ocurred.' if thought.is_error else ''} "
+                        f"output omitted ({_obs_len}) lines\n")
+                else:
+                    user_str=(
+                        f"observation: error ocurred. detailed output omitted "
+                        f"({_obs_len}) lines\n"
+                    )
             else:
-                if thought.is_error is None or i==len(self.thoughts)-1:
-                    assistant_str=f"next_thought:{thought.next_thought}\nnext_tool_name:{thought.next_tool_name}\nnext_tool_args:{thought.next_tool_args}"
-                    # Render list observations as JSON array for the model
-                    if isinstance(thought.observation, (list, tuple)):
+                # Render list observations as JSON array for the model; the
+                # rendering is cached on the thought since history is
+                # re-serialized on every LLM turn.
+                if obs_is_seq:
+                    obs_render=thought._obs_rendered
+                    if obs_render is None:
                         try:
-                            obs_render=json.dumps(list(thought.observation), ensure_ascii=False)
+                            obs_render=_dumps(list(obs))
                         except Exception:
-                            obs_render=str(thought.observation)
-                    else:
-                        obs_render=str(thought.observation)
-                    user_str=f"observation: {obs_render}"
+                            obs_render=str(obs)
+                        thought._obs_rendered=obs_render
                 else:
-                    if self.thoughts[-1].is_error==None and thought.is_error!=None:
-                        assistant_str = (
-                            f"next_thought:{thought.next_thought}\n"
-                            f"next_tool_name:{thought.next_tool_name}\n"
-                            f"next_tool_args:{thought.next_tool_args}")
-                        if thought.observation is None:
-                            _obs_len = 0
-                        elif isinstance(thought.observation, (list, tuple)):
-                            _obs_len = len(thought.observation)
-                        else:
-                            _obs_len = len(str(thought.observation).splitlines())
-                        user_str=(
-                            f"observation: error ocurred. detailed output omitted "
-                            f"({_obs_len}) lines\n"
-                        )
-                    else:
-                        assistant_str=f"next_thought:{thought.next_thought}\nnext_tool_name:{thought.next_tool_name}\nnext_tool_args:{thought.next_tool_args}"
-                        if isinstance(thought.observation, (list, tuple)):
-                            try:
-                                obs_render=json.dumps(list(thought.observation), ensure_ascii=False)
-                            except Exception:
-                                obs_render=str(thought.observation)
-                        else:
-                            obs_render=str(thought.observation)
-                        user_str=f"observation: {obs_render}"
-            messages.append({"role":"assistant","content":assistant_str})
-            messages.append({"role":"user","content":user_str})
+                    obs_render=obs_str if obs_str is not None else str(obs)
+                user_str=f"observation: {obs_render}"
+            # One extend per thought instead of two append dispatches.
+            messages.extend(({"role":"assistant","content":assistant_str},
+                             {"role":"user","content":user_str}))
         return messages
 
 class Utils:
@@ -784,29 +1115,72 @@ class Utils:
     @classmethod
     def load_json(cls,json_string:str)->dict:
         try:
-            return json.loads(json_string)
-        except Exception as e:
-            try:
-                return eval(json_string)
-            except Exception as e:
-                fixed_json=EnhancedNetwork.fix_json_string_with_llm(json_string)
-                # if fixed_json == ""
-                if fixed_json:
-                    return fixed_json
-                else:
-                    raise JSONDecodeError(f"Invalid JSON: {json_string}")
+            return _loads(json_string)
+        except Exception:
+            pass
+        # literal_eval covers the Python-flavoured payloads (single quotes,
+        # True/None) the old eval fallback accepted, without executing
+        # arbitrary expressions.
+        try:
+            return ast.literal_eval(json_string)
+        except Exception:
+            pass
+        # Only pay the LLM round-trip once both cheap parsers have failed.
+        fixed_json=EnhancedNetwork.fix_json_string_with_llm(json_string)
+        # if fixed_json == ""
+        if fixed_json:
+            return fixed_json
+        else:
+            raise JSONDecodeError(f"Invalid JSON: {json_string}")
     @classmethod
     def log_to_failed_messages(cls,text_resp:str):
-        with open("../failed_messages.csv","a") as f:
-                writer=csv.writer(f)
-                writer.writerow([text_resp])
-
-class FunctionVisitor(ast.NodeVisitor):
-    def __init__(self, file_content: str):
+        global _failed_rows
+        with _failed_lock:
+            _get_failed_writer().writerow([text_resp])
+            _failed_rows += 1
+            # Flush on interval so a retry storm stays buffered but rows are
+            # not held in memory indefinitely.
+            if _failed_rows % 8 == 0:
+                _failed_fh.flush()
+
+# Statement nodes whose subtrees can still contain a def or class;
+# descending into anything else (expression leaves) is wasted traversal.
+_DEF_CONTAINERS = (
+    ast.Module, ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef,
+    ast.For, ast.AsyncFor, ast.While, ast.If, ast.With, ast.AsyncWith,
+    ast.Try, ast.ExceptHandler, ast.Match, ast.match_case,
+)
+if hasattr(ast, "TryStar"):
+    _DEF_CONTAINERS += (ast.TryStar,)
+
+class _DefScanVisitor(ast.NodeVisitor):
+    def generic_visit(self, node):
+        # Iterate node._fields directly instead of NodeVisitor's
+        # iter_fields generator, and only recurse into statements that can
+        # still hold a def — the bulk of a module's nodes are expression
+        # leaves that would otherwise each pay a visit_* dispatch lookup.
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for child in value:
+                    if isinstance(child, _DEF_CONTAINERS):
+                        self.visit(child)
+            elif isinstance(value, _DEF_CONTAINERS):
+                self.visit(value)
+
+class FunctionVisitor(_DefScanVisitor):
+    def __init__(self, file_content: str, target_name: Optional[str] = None):
         self.functions = {}
         self.current_class = None
         self.class_hierarchy = []
         self.file_content = file_content
+        # When set, only the matching def gets its body extracted; other
+        # defs are walked (shadowed duplicates must keep last-wins order)
+        # but skip the per-def line join that dominates a full catalogue.
+        self.target_name = target_name
+        # Split once up front; _process_function runs per def, and
+        # re-splitting a large file for each visited node is O(defs*lines).
+        self.lines = file_content.split("\n")
 
     def visit_ClassDef(self, node):
         self.class_hierarchy.append(node.name)
@@ -817,16 +1191,18 @@ class FunctionVisitor(ast.NodeVisitor):
 
     def _process_function(self, node):
         full_function_name = f"{self.current_class}::{node.name}" if self.current_class else node.name
+        if self.target_name is not None and full_function_name != self.target_name:
+            self.generic_visit(node)
+            return
         line_number = node.lineno
         if isinstance(node.decorator_list, list) and len(node.decorator_list) > 0:
             line_number = node.decorator_list[0].lineno
         
-        end_line_number = line_number
-        if isinstance(node.body, list) and len(node.body) > 0:
-            end_line_number = node.body[-1].lineno
+        # end_lineno covers a multi-line trailing statement, which
+        # node.body[-1].lineno would truncate.
+        end_line_number = node.end_lineno or line_number
         
-        lines = self.file_content.split("\n")
-        body = "\n".join(lines[line_number-1:end_line_number])
+        body = "\n".join(self.lines[line_number-1:end_line_number])
         
         self.functions[full_function_name] = {
             "class": self.current_class,
@@ -846,26 +1222,186 @@ class FunctionVisitor(ast.NodeVisitor):
         self.generic_visit(node)
         self.current_class = None
 
-class ClassVisitor(ast.NodeVisitor):
-    def __init__(self, file_content: str):
+class ClassVisitor(_DefScanVisitor):
+    def __init__(self, file_content: str, target_name: Optional[str] = None):
         self.classes = {}
         self.file_content = file_content
+        self.target_name = target_name
+        self.lines = file_content.split("\n")
 
     def visit_ClassDef(self, node):
+        if self.target_name is not None and node.name != self.target_name:
+            self.generic_visit(node)
+            return
         line_number = node.lineno
         if isinstance(node.decorator_list, list) and len(node.decorator_list) > 0:
             line_number = node.decorator_list[0].lineno
-        end_line_number = line_number
-        if isinstance(node.body, list) and len(node.body) > 0:
-            end_line_number = node.body[-1].lineno
-        lines = self.file_content.split("\n")
-        body = "\n".join(lines[line_number-1:end_line_number])
+        end_line_number = node.end_lineno or line_number
+        body = "\n".join(self.lines[line_number-1:end_line_number])
         self.classes[node.name] = {
             "body": body,
             "line_number": line_number
         }
         self.generic_visit(node)
 
+def fast_parse(source: str, filename: str = "<unknown>"):
+    '''
+    ast.parse for structural inspection: PyCF_ONLY_AST via compile() with
+    optimize=2 skips type-comment handling and folds __debug__, shaving a
+    slice off parser time. Raises SyntaxError exactly like ast.parse.
+    '''
+    return compile(source, filename, "exec", flags=ast.PyCF_ONLY_AST, optimize=2)
+
+_syntax_check_cache = {}
+_SYNTAX_CHECK_CACHE_MAX = 256
+
+def _syntax_error_message(content: str, filename: str = "<unknown>") -> Optional[str]:
+    '''
+    Return the SyntaxError message for content, or None if it compiles.
+    Keyed by a blake2b digest of the content so repeated checks of the same
+    candidate (save -> re-save, insertion retries) skip the compile without
+    the cache pinning whole file bodies in memory.
+    '''
+    key = (hashlib.blake2b(content.encode("utf-8", "surrogatepass"), digest_size=16).digest(), filename)
+    if key in _syntax_check_cache:
+        return _syntax_check_cache[key]
+    try:
+        # Validity is all that matters here, so compile without keeping a
+        # tree around. dont_inherit keeps this module's __future__ imports
+        # from leaking into the check, and the symtable pass also rejects
+        # post-parse errors (e.g. 'return' at module level) that a bare
+        # AST parse lets through.
+        compile(content, filename, "exec", dont_inherit=True)
+        msg = None
+    except SyntaxError as e:
+        msg = str(e)
+    if len(_syntax_check_cache) >= _SYNTAX_CHECK_CACHE_MAX:
+        _syntax_check_cache.pop(next(iter(_syntax_check_cache)))
+    _syntax_check_cache[key] = msg
+    return msg
+
+# On-disk AST cache shared across agent invocations: successive workflow
+# steps re-inspect the same repo snapshot from fresh processes, and the
+# in-memory lru_caches above die with each process. Lives under the system
+# temp dir rather than the repo so it can never leak into a git patch.
+def _private_cache_dir() -> str | None:
+    '''
+    Per-user cache directory, created mode 0700. Entries are pickles, so
+    the directory must not be writable (or plantable) by other users: a
+    symlink, a foreign owner or group/world access disables the cache
+    rather than trusting its contents.
+    '''
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    path = os.path.join(tempfile.gettempdir(), f"ast_cache-{uid}")
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != uid or (st.st_mode & 0o077):
+            return None
+    except Exception:
+        return None
+    return path
+
+_AST_CACHE_DIR = _private_cache_dir()
+
+def _load_or_parse(source: str, filename: str = "<unknown>"):
+    '''
+    fast_parse with a pickle cache keyed by source SHA-256 and interpreter
+    version (AST pickles are not stable across minor versions). Cache
+    misses and I/O failures fall back to a plain parse.
+    '''
+    if _AST_CACHE_DIR is None:
+        return fast_parse(source, filename)
+    sha = hashlib.sha256(source.encode("utf-8", "surrogatepass")).hexdigest()
+    cache_path = os.path.join(_AST_CACHE_DIR, f"{sha}-{sys.version_info[0]}.{sys.version_info[1]}.pkl")
+    try:
+        with open(cache_path, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        pass
+    tree = fast_parse(source, filename)
+    try:
+        os.makedirs(_AST_CACHE_DIR, mode=0o700, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+        # Atomic rename so a concurrent reader never sees a torn pickle.
+        os.replace(tmp_path, cache_path)
+    except Exception:
+        pass
+    return tree
+
+@functools.lru_cache(maxsize=256)
+def _parse_file_cached(file_path: str, mtime_ns: int, size: int):
+    # mtime_ns/size are part of the key purely to invalidate stale entries;
+    # a re-stat per call is far cheaper than re-reading and re-parsing.
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    return content, _load_or_parse(content, file_path)
+
+def parse_file(file_path: str):
+    '''
+    Read and ast.parse a source file, memoized on (path, mtime_ns, size).
+    Returns (content, tree). The same files get inspected repeatedly across
+    tool calls within a run, so this skips redundant reads and parses.
+    '''
+    stat = os.stat(file_path)
+    return _parse_file_cached(file_path, stat.st_mtime_ns, stat.st_size)
+
+@functools.lru_cache(maxsize=256)
+def _visit_file_cached(file_path: str, mtime_ns: int, size: int):
+    content, tree = _parse_file_cached(file_path, mtime_ns, size)
+    function_visitor = FunctionVisitor(content)
+    function_visitor.visit(tree)
+    class_visitor = ClassVisitor(content)
+    class_visitor.visit(tree)
+    return content, function_visitor.functions, class_visitor.classes
+
+def visit_file(file_path: str):
+    '''
+    Parse a source file and extract its function and class bodies, memoized
+    like parse_file. Returns (content, functions, classes). Lookups for
+    several names in one file — or repeat lookups across tool calls —
+    share a single parse-and-visit pass.
+    '''
+    stat = os.stat(file_path)
+    return _visit_file_cached(file_path, stat.st_mtime_ns, stat.st_size)
+
+@functools.lru_cache(maxsize=256)
+def _function_ranges_cached(file_path: str, mtime_ns: int, size: int):
+    # (start, end, name) spans of every def in the file; the ast.walk is
+    # what repeat callers were paying for, the parse itself is already
+    # memoized above.
+    tree = _parse_file_cached(file_path, mtime_ns, size)[1]
+    func_ranges: list[tuple[int, int, str]] = []
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            start = getattr(node, 'lineno', None)
+            end = getattr(node, 'end_lineno', None)
+            if start is not None and end is not None:
+                func_ranges.append((start, end, node.name))
+    return func_ranges
+
+def _outermost_ranges(func_ranges):
+    # Function spans either nest or are disjoint, and the walk order puts
+    # outer defs before their inner defs, so every line query resolves to
+    # the outermost containing span. Sorting by start and dropping nested
+    # spans leaves disjoint intervals that bisect can search in O(log n).
+    outer: list[tuple[int, int, str]] = []
+    for span in sorted(func_ranges):
+        if outer and span[0] <= outer[-1][1]:
+            continue
+        outer.append(span)
+    return outer
+
+def _range_for_line(outer_ranges, starts, line_no):
+    # outer_ranges/starts come from _outermost_ranges; returns the span
+    # containing line_no or None.
+    idx = bisect.bisect_right(starts, line_no) - 1
+    if idx >= 0 and outer_ranges[idx][1] >= line_no:
+        return outer_ranges[idx]
+    return None
+
 class EnhancedNetwork:
     class ErrorType(Enum):
         EMPTY_RESPONSE=1
@@ -877,10 +1413,28 @@ class EnhancedNetwork:
         NETWORK_ERROR=7
         AUTHENTICATION_ERROR=8
         RESOURCE_EXHAUSTED=9
-    
+
+    # Leftmost known tag in an error body decides both the counter bucket and
+    # whether the failure is worth echoing back to the model; one regex scan
+    # replaces a chain of substring checks over the same string.
+    _ERR_TAGS = {
+        "RATE_LIMIT_EXCEEDED": ErrorType.RATE_LIMIT_EXCEEDED,
+        "RESERVED_TOKEN_PRESENT": ErrorType.RESERVED_TOKEN_PRESENT,
+        "EMPTY_RESPONSE": ErrorType.EMPTY_RESPONSE,
+        "TIMEOUT": ErrorType.TIMEOUT,
+        "Invalid JSON": ErrorType.INVALID_RESPONSE_FORMAT,
+        "Invalid response": ErrorType.INVALID_RESPONSE_FORMAT,
+    }
+    _ERR_RE = re.compile("|".join(map(re.escape, _ERR_TAGS)))
+    # Transient failures are retried silently instead of being fed back.
+    _ERR_TRANSIENT = frozenset(("RATE_LIMIT_EXCEEDED", "RESERVED_TOKEN_PRESENT", "EMPTY_RESPONSE", "TIMEOUT"))
+    # Built once; get_error_counter hands out C-level copies instead of
+    # re-walking the enum members per retry invocation.
+    _ERROR_COUNTER_TEMPLATE = {k: 0 for k in ErrorType.__members__}
+
     @classmethod
     def is_valid_response(cls,raw_text:str)->bool:
-        if type(raw_text) is dict and raw_text.get("error",None) is not None and raw_text.get("error")!="":
+        if isinstance(raw_text,dict) and raw_text.get("error",None) is not None and raw_text.get("error")!="":
             return False,cls.ErrorType.EMPTY_RESPONSE.name
         if not raw_text.strip().endswith("}") and not raw_text.strip().endswith("}]"):
             return False, "Incomplete response, your response must be shorter to fit within context limit"
@@ -898,12 +1452,22 @@ class EnhancedNetwork:
 
     @classmethod
     def get_error_counter(cls)->dict[str,int]:
-        return {
-            k:0 for k in cls.ErrorType.__members__
-        }   
+        return cls._ERROR_COUNTER_TEMPLATE.copy()
+
+    # Malformed outputs repeat (same truncation, same model misfire), so
+    # successful repairs are memoized on the normalized input; failures are
+    # not cached since a retry may succeed.
+    _fix_json_cache: dict[str, dict] = {}
+    _FIX_JSON_CACHE_MAX = 256
 
     @classmethod
     def fix_json_string_with_llm(cls,json_string:str,attempt:int=0)->dict:
+        key=json_string.strip()
+        cached=cls._fix_json_cache.get(key)
+        if cached is not None:
+            # Hand out a copy: callers mutate tool-args dicts in place, and a
+            # shared reference would poison every later hit on this key.
+            return copy.deepcopy(cached)
         messages=[
             {"role":"system", "content":"Fix the json string sent by the user.  Reply only with the json string and nothing else."},
             {"role":"user", "content":json_string}
@@ -911,21 +1475,24 @@ class EnhancedNetwork:
         response=cls.make_request(messages, model=DEEPSEEK_MODEL_NAME)
         try:
             response=response.replace('```json','').strip('```')
-            response=json.loads(response)
+            response=_loads(response)
+            if len(cls._fix_json_cache) >= cls._FIX_JSON_CACHE_MAX:
+                cls._fix_json_cache.pop(next(iter(cls._fix_json_cache)))
+            cls._fix_json_cache[key]=copy.deepcopy(response)
             return response
         except JSONDecodeError as e:
             return None
     
     @classmethod
     def make_request(cls,messages:list,model:str,attempt:int=0, temperature:float=0.0)->str:
-        logger.info(f"Making LLM request to {model} (attempt {attempt+1}, temp: {temperature})")
+        logger.info('Making LLM request to %s (attempt %s, temp: %s)', model, attempt+1, temperature)
         global run_id
-        logger.info(f"Starting inference: model={model}, num_messages={len(messages)}, temperature={temperature}, run_id={run_id}")
+        logger.info('Starting inference: model=%s, num_messages=%s, temperature=%s, run_id=%s', model, len(messages), temperature, run_id)
         url = f"{DEFAULT_PROXY_URL.rstrip('/')}/api/inference"
 
         # Cache miss - make the actual request
         request_data = {
-                "run_id": run_id if run_id else str(uuid4()),
+                "run_id": run_id if run_id else _FALLBACK_RUN_ID,
                 "messages": messages,
                 "temperature": temperature,
             }
@@ -934,9 +1501,12 @@ class EnhancedNetwork:
             "Content-Type": "application/json"
         }
         request_data['model'] = model
-        
+
+        import requests
         try:
-            response = requests.post(url, data=json.dumps(request_data), timeout=120, headers=headers)
+            # One serialization pass straight to bytes; a str body would be
+            # re-encoded to utf-8 inside requests.
+            response = get_http_session().post(url, data=_dumps_bytes(request_data), timeout=120, headers=headers)
             response.raise_for_status()
         except requests.exceptions.Timeout:
             return f"ERROR: Request timeout for model {model}"
@@ -953,17 +1523,17 @@ class EnhancedNetwork:
             return f"ERROR: Invalid JSON response for model {model}"
         
         try:
-            is_oai_interface= type(response_json) is dict and response_json.get('choices') is not None and len(response_json.get('choices'))>0 and response_json.get('choices')[0].get('message') is not None
+            is_oai_interface= isinstance(response_json,dict) and response_json.get('choices') is not None and len(response_json.get('choices'))>0 and response_json.get('choices')[0].get('message') is not None
             if is_oai_interface:
                 raw_text=response_json['choices'][0]['message']['content']
             else:
-                if type(response_json) is str:
+                if isinstance(response_json,str):
                     raw_text=response_json.strip("\n").strip()
                 else:
                     raw_text=response_json
-            if type(raw_text) is not dict:
+            if not isinstance(raw_text,dict):
                 raw_text=raw_text.lstrip()
-            logger.info(f"LLM response received from {model} (length: {len(str(raw_text)) if raw_text else 0} chars)")
+            logger.info('LLM response received from %s (length: %s chars)', model, len(str(raw_text)) if raw_text else 0)
             return raw_text
         except (KeyError, IndexError, TypeError) as e:
             logger.error(f"Invalid response structure for model {model}: {e}")
@@ -986,7 +1556,7 @@ class EnhancedNetwork:
         for attempt in range(max_retries):
             try:
                 total_attempts+=1
-                index = AGENT_MODELS.index(model) if model in AGENT_MODELS else -1
+                index = _MODEL_INDEX.get(model, -1)
                 raw_text=cls.make_request(messages,model=AGENT_MODELS[(index + attempt)%len(AGENT_MODELS)], temperature=temperature)
                 is_valid,error_msg=cls.is_valid_response(raw_text)
                 if not(is_valid):
@@ -999,22 +1569,11 @@ class EnhancedNetwork:
             except Exception as e:
                 error_body = str(e)
                 if attempt < max_retries:
-                    delay = base_delay 
-                    if "RATE_LIMIT_EXCEEDED" in error_body:
-                        error_counter[cls.ErrorType.RATE_LIMIT_EXCEEDED.name]+=1
-                    elif "RESERVED_TOKEN_PRESENT" in error_body:
-                        error_counter[cls.ErrorType.RESERVED_TOKEN_PRESENT.name]+=1
-                    elif "EMPTY_RESPONSE" in error_body:
-                        error_counter[cls.ErrorType.EMPTY_RESPONSE.name]+=1
-                    elif "TIMEOUT" in error_body:
-                        error_counter[cls.ErrorType.TIMEOUT.name]+=1
-                    elif "Invalid JSON" in error_body:
-                        error_counter[cls.ErrorType.INVALID_RESPONSE_FORMAT.name]+=1
-                    elif "Invalid response" in error_body:
-                        error_counter[cls.ErrorType.INVALID_RESPONSE_FORMAT.name]+=1
-                    else:
-                        error_counter[cls.ErrorType.UNKNOWN.name]+=1
-                    if "RATE_LIMIT_EXCEEDED" not in error_body and "RESERVED_TOKEN_PRESENT" not in error_body and "EMPTY_RESPONSE" not in error_body and  "TIMEOUT" not in error_body:
+                    delay = base_delay
+                    match_tag = cls._ERR_RE.search(error_body)
+                    tag = match_tag.group(0) if match_tag else None
+                    error_counter[cls._ERR_TAGS[tag].name if tag else cls.ErrorType.UNKNOWN.name]+=1
+                    if tag not in cls._ERR_TRANSIENT:
                         messages.append({"role":"assistant","content":raw_text})
                         messages.append({"role":"user","content":"observation: "+error_body})
                     time.sleep(random.uniform(1.2*delay, 1.5*delay))
@@ -1026,19 +1585,23 @@ class EnhancedNetwork:
         return next_thought, next_tool_name, next_tool_args,raw_text,total_attempts,error_counter,messages
     
     
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _malformed_json_re(arguments: tuple[str, ...]):
+        # Tool-arg schemas repeat across calls, so memoize the compiled
+        # pattern per key tuple; the keys are escaped since they are
+        # interpolated into the regex.
+        return re.compile(r',\s*'.join(f'"{re.escape(k)}": (.*)' for k in arguments))
+
     @classmethod
-    def parse_malformed_json(cls,arguments:list[str], json_string:str)->dict | str:    
+    def parse_malformed_json(cls,arguments:list[str], json_string:str)->dict | str:
         # pattern of general json string with unescaped " in values keys from keys list
-        pattern = ''
-        for i, k in enumerate(arguments):
-            pattern += f'"{k}": (.*)'
-            if i != len(arguments) - 1:
-                pattern += r',\s*'
+        pattern=cls._malformed_json_re(tuple(arguments))
 
-        match=re.search(pattern, json_string)
+        match=pattern.search(json_string)
 
         if not match:
-            return f"Error: {json_string} can not match pattern {pattern}"
+            return f"Error: {json_string} can not match pattern {pattern.pattern}"
         
         result_json={}
         for i in range(len(arguments)):
@@ -1077,7 +1640,7 @@ class EnhancedNetwork:
     def inference(cls, messages: List[Dict[str, Any]], model: str, run_id: str = str(uuid4()),return_json:bool=False, temperature:float=0.0) -> dict:
         """Prod inference with caching"""
     
-        logger.info(f"Starting inference: model={model}, num_messages={len(messages)}, temperature={temperature}, run_id={run_id}")
+        logger.info('Starting inference: model=%s, num_messages=%s, temperature=%s, run_id=%s', model, len(messages), temperature, run_id)
         cleaned_msgs: List[Dict[str, Any]] = []
         for m in messages:
             role = m.get("role")
@@ -1095,22 +1658,21 @@ class EnhancedNetwork:
 
         next_thought,next_tool_name,next_tool_args,raw_text,total_attempts,error_counter,messages = cls._request_next_action_with_retry(cleaned_msgs, model=model, temperature=temperature)
         
-        logger.info(f"Inference completed: tool={next_tool_name}, attempts={total_attempts}, errors={sum(error_counter.values()) if error_counter else 0}")
+        logger.info('Inference completed: tool=%s, attempts=%s, errors=%s', next_tool_name, total_attempts, sum(error_counter.values()) if error_counter else 0)
         return next_thought,next_tool_name,next_tool_args,raw_text,total_attempts,error_counter,messages
     
     @classmethod
     def sanitise_text_resp(cls,text_resp:str)->str:
         # remove all leading and trailing quotes
-        text_resp=re.sub("[\'\"]*next_thought[\'\"]*:","next_thought:",text_resp)
-        text_resp=re.sub("[\'\"]*next_tool_name[\'\"]*:","next_tool_name:",text_resp)
-        text_resp=re.sub("[\'\"]*next_tool_args[\'\"]*:","next_tool_args:",text_resp)
-        text_resp=re.sub("[\'\"]*observation[\'\"]*:","observation:",text_resp)
+        text_resp=_RESP_KEY_RE.sub(r"\1:",text_resp)
         if "next_thought" not in text_resp and "next_tool_name:" in text_resp and "next_tool_args:" in text_resp and text_resp.find("next_tool_name:")<text_resp.find("next_tool_args:") and text_resp.find("next_tool_name:")>10:
             text_resp="next_thought: "+text_resp
         if "next_tool_name:" in text_resp and "next_tool_args:" in text_resp and text_resp.find("next_tool_name:")<text_resp.find("next_tool_args:"):
             # remove all leading and trailing quotes in tool_name
-            next_tool_name=text_resp.split("next_tool_name:")[1].split("next_tool_args:")[0].strip().strip("\n").strip("\'").strip("\"").strip()
-            text_resp=re.sub(f"next_tool_name:[\'\" ]*{next_tool_name}[\'\" ]*","next_tool_name: "+next_tool_name,text_resp)
+            next_tool_name=_mstrip(text_resp.split("next_tool_name:")[1].split("next_tool_args:")[0])
+            # Escape the extracted name: it is interpolated into the pattern,
+            # and re's own cache memoizes the compiled form per tool name.
+            text_resp=re.sub("next_tool_name:[\'\" ]*"+re.escape(next_tool_name)+"[\'\" ]*","next_tool_name: "+next_tool_name,text_resp)
         
         return text_resp
 
@@ -1118,13 +1680,24 @@ class EnhancedNetwork:
     def parse_response(cls,text_resp: str)->tuple[str, Any, Any]:
         error_msg=None
         text_resp = text_resp.strip()
-        text_resp=text_resp.split("observation:")[0]
-        text_resp=text_resp.strip().strip("\n")
+        i_obs=text_resp.find("observation:")
+        if i_obs!=-1:
+            text_resp=text_resp[:i_obs]
+        text_resp=text_resp.strip()
         text_resp=cls.sanitise_text_resp(text_resp)
-        if "next_thought:" in text_resp and "next_tool_name:" in text_resp and "next_tool_args:" in text_resp and text_resp.find("next_thought:")<text_resp.find("next_tool_name:") and text_resp.find("next_tool_name:")<text_resp.find("next_tool_args:"):
-            next_thought=text_resp.split("next_thought:")[1].split("next_tool_name:")[0].strip().strip("\n")
-            next_tool_name_raw=text_resp.split("next_tool_name:")[1].split("next_tool_args:")[0].strip().strip("\n")
-            next_tool_args_raw=text_resp.split("next_tool_args:")[1].strip().split("next_thought:")[0].strip().strip("\n")
+        # Scan for each marker once and validate ordering on the indices;
+        # slicing between them replaces the chained split() allocations.
+        i_t=text_resp.find("next_thought:")
+        i_n=text_resp.find("next_tool_name:")
+        i_a=text_resp.find("next_tool_args:")
+        if i_t!=-1 and i_n!=-1 and i_a!=-1 and i_t<i_n<i_a:
+            next_thought=text_resp[i_t+13:i_n].strip()
+            next_tool_name_raw=text_resp[i_n+15:i_a].strip()
+            args_tail=text_resp[i_a+15:]
+            i_repeat=args_tail.find("next_thought:")
+            if i_repeat!=-1:
+                args_tail=args_tail[:i_repeat]
+            next_tool_args_raw=args_tail.strip()
             try:
                 # Enforce arrays per new contract: if single string/object, wrap as arrays
                 if next_tool_name_raw.startswith("["):
@@ -1141,15 +1714,15 @@ class EnhancedNetwork:
                 Utils.log_to_failed_messages(text_resp)
                 
         else:
-            if "next_thought:" not in text_resp:
+            if i_t==-1:
                 error_msg="Invalid response. next_thought not found"
-            elif "next_tool_name:" not in text_resp:
+            elif i_n==-1:
                 error_msg="Invalid response. next_tool_name not found"
-            elif "next_tool_args:" not in text_resp:
+            elif i_a==-1:
                 error_msg="Invalid response. next_tool_args not found"
-            elif text_resp.find("next_thought:")>text_resp.find("next_tool_name:"):
+            elif i_t>i_n:
                 error_msg="Invalid response. next_thought is after next_tool_name"
-            elif text_resp.find("next_tool_name:")>text_resp.find("next_tool_args:"):
+            elif i_n>i_a:
                 error_msg="Invalid response. next_tool_name is after next_tool_args"
             Utils.log_to_failed_messages(text_resp)
             return None,None,None,error_msg
@@ -1185,11 +1758,11 @@ class EnhancedToolManager:
 
     def tool(fn):
         def wrapper(self, *args, **kwargs):
-            logger.info(f"Using tool: {fn.__name__} with args: {args[:2] if len(args) > 2 else args}, kwargs: {list(kwargs.keys())}")
+            logger.info('Using tool: %s with args: %s, kwargs: %s', fn.__name__, args[:2] if len(args) > 2 else args, list(kwargs.keys()))
             self.tool_invocations[fn.__name__]+=1
             try:
                 result = fn(self, *args, **kwargs)
-                logger.info(f"Tool {fn.__name__} completed successfully (result length: {len(str(result)) if result else 0} chars)")
+                logger.info('Tool %s completed successfully (result length: %s chars)', fn.__name__, len(str(result)) if result else 0)
                 return result
             except EnhancedToolManager.Error as e:
                 self.tool_failure[fn.__name__][e.error_type]+=1
@@ -1203,6 +1776,10 @@ class EnhancedToolManager:
         wrapper.__annotations__ = fn.__annotations__.copy()
         wrapper.__signature__ = inspect.signature(fn)
         wrapper.is_tool=True
+        # Reflect over the signature and docstring once at decoration time;
+        # manager construction and dispatch then reuse the cached schema.
+        wrapper._tool_schema = EnhancedToolManager.tool_parsing(wrapper)
+        wrapper._required_args = tuple(wrapper._tool_schema['input_schema']['required'])
 
         return wrapper
 
@@ -1221,6 +1798,11 @@ class EnhancedToolManager:
             output_description="Output: "+output_description[1].strip()
             doc=doc+"\n\n"+output_description
         sig = inspect.signature(fn)
+        # Collect every "name: description" pair from the docstring in one
+        # scan instead of re-searching the full docstring per parameter.
+        param_docs = {}
+        for m in _PARAM_DOC_RE.finditer(doc_fn):
+            param_docs.setdefault(m.group(1), m.group(2))
         properties = {}
         required = []
         for param in sig.parameters.values():
@@ -1229,10 +1811,8 @@ class EnhancedToolManager:
             if param.default is param.empty and param.kind in (param.POSITIONAL_OR_KEYWORD, param.KEYWORD_ONLY):
                 required.append(param.name)
             type_hint = str(param.annotation) if param.annotation != param.empty else "string"
-            param_description=re.search(f"{param.name}:([^\n]+)",doc_fn)
-            if param_description:
-                param_description=param_description.group(1)
-            else:
+            param_description=param_docs.get(param.name)
+            if param_description is None:
                 raise ValueError(f"Parameter description not found for {param.name} in {doc_fn}: tool name: {name}")
             if ("list" in type_hint.lower()) and ("str" in type_hint):
                 properties[param.name] = {
@@ -1277,8 +1857,18 @@ class EnhancedToolManager:
         else:
             return self.TOOL_LIST[tool_name]['input_schema']['required']
 
+    _tool_docs_cache: Optional[str] = None
+    _tool_docs_count: int = 0
+
     def get_tool_docs(self)->str:
-        return '\n\n'.join([json.dumps(tool_metadata, ensure_ascii=False) for _,tool_metadata in self.TOOL_LIST.items()])
+        # The docs go into every system prompt; serialize the registry once
+        # and reuse it until a registration grows TOOL_LIST (tools are only
+        # ever added, so the count is a sufficient invalidation key).
+        cls = self.__class__
+        if cls._tool_docs_cache is None or cls._tool_docs_count != len(self.TOOL_LIST):
+            cls._tool_docs_cache = '\n\n'.join([json.dumps(tool_metadata, ensure_ascii=False) for _,tool_metadata in self.TOOL_LIST.items()])
+            cls._tool_docs_count = len(self.TOOL_LIST)
+        return cls._tool_docs_cache
 
     def get_tool(self,tool_name:str):
         if tool_name not in self.TOOL_LIST:
@@ -1291,17 +1881,23 @@ class EnhancedToolManager:
     
     
     def _check_syntax_error(self,content:str,file_path:str="<unknown>")->bool:
-        try:
-            ast.parse(content, filename=file_path)
+        msg = _syntax_error_message(content, file_path)
+        if msg is None:
             return False, None
-        except SyntaxError as e:
-            return True, EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.SYNTAX_ERROR.name,f"Syntax error. {str(e)}")
+        return True, EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.SYNTAX_ERROR.name,f"Syntax error. {msg}")
 
-    def _save(self,file_path: str, content: str)->str:
-        is_syntax_error, error = self._check_syntax_error(content)
+    def _save(self,file_path: str, content: str, validated: bool=False)->str:
+        # validated=True lets callers that already syntax-checked this exact
+        # content (e.g. insertion retry loops) skip the re-parse.
+        is_syntax_error, error = (False, None) if validated else self._check_syntax_error(content)
         if not is_syntax_error:
             with open(file_path, "w") as file:
                 file.write(content)
+            # Drop memoized parses; mtime alone can be too coarse to notice
+            # a rewrite that lands within the same timestamp tick.
+            _parse_file_cached.cache_clear()
+            _visit_file_cached.cache_clear()
+            _function_ranges_cached.cache_clear()
             # self.new_files_created.append(file_path)
             return f"File {file_path} saved successfully"
         else:
@@ -1315,32 +1911,102 @@ class EnhancedToolManager:
         '''
         try:
             # Update to include cfg, txt, and toml files along with py files
-            # Check whether ignore_files is a property of this clas
-            command = f"""
-            shopt -s globstar
-
-            cp .gitignore .gitignore.backup 2>/dev/null || true
-            echo 'src/agent.py' >> .gitignore
-            echo 'src/agent_runner.py' >> .gitignore
-
-            git add **/*.py 2>/dev/null || true
-            git add **/*.toml 2>/dev/null || true
-            git add **/*.cfg 2>/dev/null || true
-            git add **/*.txt 2>/dev/null || true
-
-            git diff --cached > .patch.txt
-            cat .patch.txt
-
-            mv .gitignore.backup .gitignore 2>/dev/null || true
-            """
-            output = subprocess.run(["bash", "-c", command], timeout=30, capture_output=True, text=True)
-            
-            return output.stdout
+            if os.path.exists(".gitignore"):
+                shutil.copy(".gitignore", ".gitignore.backup")
+            with open(".gitignore", "a") as fh:
+                fh.write("src/agent.py\nsrc/agent_runner.py\n")
+
+            files = []
+            for pat in ("**/*.py", "**/*.toml", "**/*.cfg", "**/*.txt"):
+                files.extend(glob.glob(pat, recursive=True))
+            if files:
+                subprocess.run(["git", "add", "--"] + files, timeout=30, capture_output=True)
+
+            # Read the staged diff straight from git instead of routing it
+            # through a .patch.txt file and a cat subprocess. Capture bytes
+            # and decode once: text mode's newline translation would mangle
+            # CRLF hunks in the patch.
+            patch = subprocess.check_output(["git", "diff", "--cached"], timeout=30).decode("utf-8", errors="replace")
+
+            if os.path.exists(".gitignore.backup"):
+                shutil.move(".gitignore.backup", ".gitignore")
+
+            return patch
         except Exception as e:
             return f"Error generating git patch: {e}"
 
+def _insert_after_imports(content: str, block: str) -> str:
+    # Walk only the import prologue with str.find instead of splitting and
+    # re-joining every line; work is bounded by the prologue, not the file.
+    insert_pos = 0
+    pos = 0
+    n = len(content)
+    while pos < n:
+        nl = content.find("\n", pos)
+        end = n if nl == -1 else nl
+        stripped = content[pos:end].strip()
+        # imports advance the insertion point; header comments/blank lines
+        # before them are allowed; anything else ends the prologue
+        if stripped.startswith(("import ", "from ", "#")) or stripped == "":
+            insert_pos = n if nl == -1 else nl + 1
+        else:
+            break
+        if nl == -1:
+            break
+        pos = nl + 1
+    head = content[:insert_pos]
+    if insert_pos and not head.endswith("\n"):
+        head += "\n"
+    tail = content[insert_pos:]
+    return (head + "\n" + block + ("\n\n" + tail if tail else "")).rstrip() + "\n"
+
+def _insert_before_main(content: str, block: str) -> str:
+    marker = "if __name__ == \"__main__\":"
+    idx = content.find(marker)
+    if idx == -1:
+        return None
+    return content[:idx].rstrip() + "\n\n" + block + "\n\n" + content[idx:]
+
+def _append_block(src: str, block: str) -> str:
+    return src.rstrip() + "\n\n" + block + "\n"
+
+def _prepend_block(src: str, block: str) -> str:
+    return block + "\n\n" + src
+
+# Insertion strategies for generate_test_function, keyed by position and
+# ordered by preference; built once instead of per call.
+_INSERT_STRATEGIES = {
+    "append": (_append_block,),
+    "top": (_prepend_block,),
+    "after_imports": (_insert_after_imports,),
+    "before_main": (lambda src, block: (_insert_before_main(src, block) or _append_block(src, block)),),
+    "auto": (
+        lambda src, block: (_insert_before_main(src, block) or _insert_after_imports(src, block)),
+        _append_block,
+        _prepend_block,
+    ),
+}
+
 class FixTaskEnhancedToolManager(EnhancedToolManager):
 
+    @classmethod
+    def _scan_tools(cls, available_tools: Optional[tuple] = None) -> dict:
+        # Check all classes in the method resolution order (MRO) to include inherited tools
+        cache = cls.__dict__.get("_scan_tools_cache")
+        if cache is None:
+            cache = {}
+            cls._scan_tools_cache = cache
+        if available_tools not in cache:
+            tools = {}
+            for klass in cls.__mro__:
+                for name, attr in klass.__dict__.items():
+                    if getattr(attr, "is_tool", False) and name not in tools:
+                        if available_tools is not None and name not in available_tools: # if available_tools is provided, only include tools in the list
+                            continue
+                        tools[name] = attr._tool_schema
+            cache[available_tools] = tools
+        return cache[available_tools]
+
     def __init__(self, available_tools: Optional[list[str]] = [], test_runner: str = "pytest", test_runner_mode: str = "FILE"):
         self.new_files_created=[]
         self.is_solution_approved=False
@@ -1348,13 +2014,12 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         self.test_runner_mode=test_runner_mode
         self.generated_test_files=[]
 
-        # Check all classes in the method resolution order (MRO) to include inherited tools
-        for cls in self.__class__.__mro__:
-            for name, attr in cls.__dict__.items():
-                if getattr(attr, "is_tool", False) and name not in self.TOOL_LIST:
-                    if available_tools is not None and name not in available_tools: # if available_tools is provided, only include tools in the list
-                        continue
-                    self.TOOL_LIST[name] = self.__class__.tool_parsing(attr)
+        # The MRO scan only depends on the class and the filter, so resolve it
+        # once per (class, available_tools) pair instead of on every __init__.
+        filter_key = tuple(available_tools) if available_tools is not None else None
+        for name, schema in self._scan_tools(filter_key).items():
+            if name not in self.TOOL_LIST:
+                self.TOOL_LIST[name] = schema
                 
         self.tool_failure={
             k:{j:0 for j in self.Error.ErrorType.__members__} for k in self.TOOL_LIST.keys()
@@ -1365,11 +2030,10 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         }
 
     def check_syntax_error(self,content:str,file_path:str="<unknown>")->bool:
-        try:
-            ast.parse(content, filename=file_path)
+        msg = _syntax_error_message(content, file_path)
+        if msg is None:
             return False, None
-        except SyntaxError as e:
-            return True, EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.SYNTAX_ERROR.name,f"Syntax error. {str(e)}")
+        return True, EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.SYNTAX_ERROR.name,f"Syntax error. {msg}")
 
     def _get_file_content(self,file_path: str, search_start_line: int = None, search_end_line: int = None, search_term: str = None,limit:int=5000)->str:
         if search_term is not None and search_term!="":
@@ -1377,25 +2041,24 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             
         # check if start and end line are not between a function..
         func_ranges=self.get_function_ranges(file_path)
+        outer_ranges=_outermost_ranges(func_ranges)
+        starts=[span[0] for span in outer_ranges]
         if search_start_line!=None:
-            for start, end, name in func_ranges:
-                if start<=search_start_line<=end:
-                    if start<search_start_line:
-                        search_start_line=start
+            span=_range_for_line(outer_ranges, starts, search_start_line)
+            if span is not None:
+                search_start_line=span[0]
         if search_end_line!=None:
-            for start, end, name in func_ranges:
-                if start<=search_end_line<=end:
-                    if end>search_end_line:
-                        search_end_line=end
-        with open(file_path, "r") as f:
-            if search_start_line is not None or search_end_line is not None:
-                lines = f.readlines()
-                start = max(0, (search_start_line or 1) - 1)  # Convert to 0-based
-                end = min(len(lines), search_end_line or len(lines))
-                content = ''.join(lines[start:end])
-                return f"Lines {start+1}-{end} of {file_path}:\n{content}"
-            else:
-                content = f.read()
+            span=_range_for_line(outer_ranges, starts, search_end_line)
+            if span is not None:
+                search_end_line=span[1]
+        # The parse cache already holds this file's text from the range scan
+        # above; reuse it instead of paying a second disk read.
+        content = parse_file(file_path)[0]
+        if search_start_line is not None or search_end_line is not None:
+            lines = io.StringIO(content).readlines()
+            start = max(0, (search_start_line or 1) - 1)  # Convert to 0-based
+            end = min(len(lines), search_end_line or len(lines))
+            return f"Lines {start+1}-{end} of {file_path}:\n{''.join(lines[start:end])}"
 
         return Utils.limit_strings(content, n=limit) if limit!=-1  else content
     
@@ -1450,23 +2113,26 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         '''
         parsed_solutions = []
         for solution in solutions:
-            sols = re.split(r"(Solution \d+:)", solution)
+            sols = _SOLUTION_SPLIT_RE.split(solution)
             sols = [f"{sols[i]}{sols[i+1]}" for i in range(1, len(sols), 2)]  # Combine the split parts correctly
             parsed_solutions.extend(sols)
         
         solutions = parsed_solutions
 
-        if type(solutions) is not list or len(solutions)<2:
+        if not isinstance(solutions,list) or len(solutions)<2:
             raise EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.INVALID_TOOL_CALL.name,f"Error: solutions must be a list with length at least 2.")
 
         self.is_solution_approved = True
         return "Approved"
           
-    def _save(self,file_path: str, content: str)->str:
-        is_syntax_error, error = self.check_syntax_error(content)
+    def _save(self,file_path: str, content: str, validated: bool=False)->str:
+        is_syntax_error, error = (False, None) if validated else self.check_syntax_error(content)
         if not is_syntax_error:
             with open(file_path, "w") as file:
                 file.write(content)
+            _parse_file_cached.cache_clear()
+            _visit_file_cached.cache_clear()
+            _function_ranges_cached.cache_clear()
             self.new_files_created.append(file_path)
             return f"File {file_path} saved successfully"
         else:
@@ -1500,28 +2166,6 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
 
         is_new_file = not os.path.exists(file_path)
 
-        def _insert_after_imports(content: str, block: str) -> str:
-            lines = content.splitlines()
-            insert_idx = 0
-            for i, line in enumerate(lines):
-                stripped = line.strip()
-                if stripped.startswith("import ") or stripped.startswith("from "):
-                    insert_idx = i + 1
-                elif stripped == "" or stripped.startswith("#"):
-                    # allow header comments/blank lines before imports
-                    insert_idx = max(insert_idx, i + 1)
-                else:
-                    break
-            lines = lines[:insert_idx] + (["", block, ""] if insert_idx < len(lines) else ["", block]) + lines[insert_idx:]
-            return "\n".join(lines).rstrip() + "\n"
-
-        def _insert_before_main(content: str, block: str) -> str:
-            marker = "if __name__ == \"__main__\":"
-            idx = content.find(marker)
-            if idx == -1:
-                return None
-            return content[:idx].rstrip() + "\n\n" + block + "\n\n" + content[idx:]
-
         if is_new_file:
             new_content = test_fn + "\n"
             # Validate standalone content before writing
@@ -1537,23 +2181,9 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                     self.generated_test_files.append(rel)
                 return f"Test already present in '{rel}', no changes made."
 
-            # Build candidate insertion strategies in order
-            candidates = []
-            if position == "append":
-                candidates = [lambda src: src.rstrip() + "\n\n" + test_fn + "\n"]
-            elif position == "top":
-                candidates = [lambda src: test_fn + "\n\n" + src]
-            elif position == "after_imports":
-                candidates = [lambda src: _insert_after_imports(src, test_fn)]
-            elif position == "before_main":
-                candidates = [lambda src: (_insert_before_main(src, test_fn) or src.rstrip() + "\n\n" + test_fn + "\n")]
-            elif position == "auto":
-                candidates = [
-                    lambda src: (_insert_before_main(src, test_fn) or _insert_after_imports(src, test_fn)),
-                    lambda src: src.rstrip() + "\n\n" + test_fn + "\n",
-                    lambda src: test_fn + "\n\n" + src,
-                ]
-            else:
+            # Look up the candidate insertion strategies, ordered by preference
+            candidates = _INSERT_STRATEGIES.get(position)
+            if candidates is None:
                 raise EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.INVALID_TOOL_CALL.name,f"Error: invalid position '{position}'. Use 'append', 'top', 'after_imports', 'before_main', or 'auto'.")
 
             # Try each candidate until one passes syntax check
@@ -1561,7 +2191,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             first_error = None
             for builder in candidates:
                 try:
-                    candidate = builder(original)
+                    candidate = builder(original, test_fn)
                     is_err, err = self.check_syntax_error(candidate)
                     if not is_err:
                         new_content = candidate
@@ -1576,7 +2206,8 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             if new_content is None:
                 raise EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.SYNTAX_ERROR.name,f"Error: inserting test caused syntax error. First error: {first_error}")
 
-        self._save(file_path, new_content)
+        # Every branch above has already syntax-checked new_content.
+        self._save(file_path, new_content, validated=True)
 
         # Track for exclusion from final patch
         rel = os.path.relpath(file_path)
@@ -1594,28 +2225,41 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         Output:
             dictionary of functions with function paths as keys and function bodies as values
         '''
+        # Group requests by file so each file is resolved in one pass even
+        # when many functions from the same module are asked for together.
         functions = {}
+        by_file: dict[str, list[tuple[str, str]]] = {}
         for function_path in function_paths:
             parts = function_path.split("::")
-            file_path = parts[0]
-            function_name = "::".join(parts[1:])
+            by_file.setdefault(parts[0], []).append((function_path, "::".join(parts[1:])))
+        for file_path, entries in by_file.items():
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                tree = ast.parse(content, filename=file_path)
-                visitor = FunctionVisitor(content)
-                visitor.visit(tree)
-                
-                if function_name in visitor.functions:
-                    functions[function_path] = visitor.functions[function_name].get("body", "")
+                if len(entries) == 1:
+                    # Single lookup: extract only the requested def instead
+                    # of cataloguing the whole file (the parse itself is
+                    # still memoized).
+                    content, tree = parse_file(file_path)
+                    visitor = FunctionVisitor(content, target_name=entries[0][1])
+                    visitor.visit(tree)
+                    file_functions = visitor.functions
                 else:
-                    functions[function_path] = f"Function {function_name} not found in {file_path}"
+                    file_functions = visit_file(file_path)[1]
             except FileNotFoundError:
-                functions[function_path] = f"File {file_path} not found"
+                for function_path, _ in entries:
+                    functions[function_path] = f"File {file_path} not found"
+                continue
             except Exception as e:
-                functions[function_path] = f"Error processing {file_path}: {str(e)}"
+                for function_path, _ in entries:
+                    functions[function_path] = f"Error processing {file_path}: {str(e)}"
+                continue
+            for function_path, function_name in entries:
+                if function_name in file_functions:
+                    functions[function_path] = file_functions[function_name].get("body", "")
+                else:
+                    functions[function_path] = f"Function {function_name} not found in {file_path}"
 
-        return functions
+        # Preserve the caller's ordering in the returned mapping.
+        return {path: functions[path] for path in function_paths}
 
     @EnhancedToolManager.tool
     def get_classes(self, class_paths: List[str])->Dict[str, str]:
@@ -1627,26 +2271,34 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             dictionary of classes with class paths as keys and class bodies as values
         '''
         classes = {}
+        by_file: dict[str, list[tuple[str, str]]] = {}
         for class_path in class_paths:
             parts = class_path.split("::")
-            file_path = parts[0]
-            class_name = "::".join(parts[1:])
+            by_file.setdefault(parts[0], []).append((class_path, "::".join(parts[1:])))
+        for file_path, entries in by_file.items():
             try:
-                with open(file_path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                tree = ast.parse(content, filename=file_path)
-                visitor = ClassVisitor(content)
-                visitor.visit(tree)
-                if class_name in visitor.classes:
-                    classes[class_path] = visitor.classes[class_name].get("body", "")
+                if len(entries) == 1:
+                    content, tree = parse_file(file_path)
+                    visitor = ClassVisitor(content, target_name=entries[0][1])
+                    visitor.visit(tree)
+                    file_classes = visitor.classes
                 else:
-                    classes[class_path] = f"Class {class_name} not found in {file_path}"
+                    file_classes = visit_file(file_path)[2]
             except FileNotFoundError:
-                classes[class_path] = f"File {file_path} not found"
+                for class_path, _ in entries:
+                    classes[class_path] = f"File {file_path} not found"
+                continue
             except Exception as e:
-                classes[class_path] = f"Error processing {file_path}: {str(e)}"
+                for class_path, _ in entries:
+                    classes[class_path] = f"Error processing {file_path}: {str(e)}"
+                continue
+            for class_path, class_name in entries:
+                if class_name in file_classes:
+                    classes[class_path] = file_classes[class_name].get("body", "")
+                else:
+                    classes[class_path] = f"Class {class_name} not found in {file_path}"
 
-        return classes
+        return {path: classes[path] for path in class_paths}
 
     @EnhancedToolManager.tool
     def search_in_all_files_content(self, search_term: str, case_sensitive: bool = False) -> str:
@@ -1663,43 +2315,97 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         '''
         output = []
         search_flags = 0 if case_sensitive else re.IGNORECASE
+        # Compile once per invocation; the loop below would otherwise probe
+        # re's pattern cache four times per file.
+        pattern = re.compile(search_term, search_flags)
+        # Multiline variant for the body sweep below: ^/$ then anchor at
+        # line boundaries exactly as the old per-line search did.
+        pattern_m = re.compile(search_term, search_flags | re.MULTILINE)
+        try:
+            # Bytes-compiled twin for scanning mmapped files without
+            # decoding them first.
+            pattern_b = re.compile(search_term.encode(), search_flags)
+        except (re.error, ValueError):
+            pattern_b = None
+
+        # Let rg/grep narrow the tree down first; only candidate files get
+        # read and parsed below. The Python-side content check stays, so the
+        # prefilter can only skip work, never change a match.
+        candidates = _grep_candidate_files(search_term, case_sensitive)
+
+        def scan_one_file(file_path: str) -> list[str]:
+            file_output = []
+
+            # Always check if search term is in the file name
+            if pattern.search(file_path):
+                file_output.append(f"{file_path} | Filename match")
+
+            if candidates is not None and os.path.normpath(file_path) not in candidates:
+                return file_output
+
+            if candidates is None and pattern_b is not None:
+                # No external prefilter ran: a zero-copy regex scan over the
+                # mmapped bytes decides whether the file is worth decoding
+                # and parsing at all.
+                try:
+                    with open(file_path, 'rb') as fh:
+                        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                            if pattern_b.search(mm) is None:
+                                return file_output
+                except (OSError, ValueError):
+                    pass
 
-        # Walk through all directories and find Python files
-        for root, _, files in os.walk("."):
-            # Skip .git and docs directories
-            if ".git" in root or "docs" in root:
-                continue
-
-            for file in files:
-                if file.endswith('.py'):
-                    file_path = os.path.join(root, file)
-
-                    # Always check if search term is in the file name
-                    if re.search(search_term, file_path, search_flags):
-                        output.append(f"{file_path} | Filename match")
-
-                    try:
-                        with open(file_path, "r", encoding="utf-8") as f:
-                            content = f.read()
-
-                        if not re.search(search_term, content, search_flags):
+            try:
+                content, tree = parse_file(file_path)
+
+                if not pattern.search(content):
+                    return file_output
+
+                file_functions = visit_file(file_path)[1]
+
+                for function_name, function_info in file_functions.items():
+                    body = function_info["body"]
+                    # One sweep per body; newline offsets + bisect recover
+                    # line numbers in O(matches) instead of re-searching
+                    # every line.
+                    newline_positions = None
+                    last_idx = -1
+                    for m in pattern_m.finditer(body):
+                        if newline_positions is None:
+                            newline_positions = [i for i, c in enumerate(body) if c == "\n"]
+                        idx = bisect.bisect_right(newline_positions, m.start())
+                        if idx == last_idx:
                             continue
+                        last_idx = idx
+                        start = newline_positions[idx-1] + 1 if idx else 0
+                        end = newline_positions[idx] if idx < len(newline_positions) else len(body)
+                        line_number = function_info["line_number"] + idx
+                        file_output.append(f"{file_path}:{line_number} | {function_name} | {body[start:end].rstrip()}")
+            except Exception as e:
+                pass
 
-                        # Parse the file content using AST
-                        tree = ast.parse(content, filename=file_path)
-                        visitor = FunctionVisitor(content)
-                        visitor.visit(tree)
-
-                        for function_name, function_info in visitor.functions.items():
-                            body = function_info["body"]
-                            if re.search(search_term, body, search_flags):
-                                lines = body.split("\n")
-                                for idx, line in enumerate(lines):
-                                    if re.search(search_term, line, search_flags):
-                                        line_number = function_info["line_number"] + idx
-                                        output.append(f"{file_path}:{line_number} | {function_name} | {line.rstrip()}")
-                    except Exception as e:
-                        pass
+            return file_output
+
+        # Walk through all directories and find Python files, skipping .git
+        # and docs directories. Pruning dirs in place stops the walk from
+        # ever descending into vendored/derived trees (a site-packages dir
+        # alone can hold tens of thousands of irrelevant .py files).
+        file_paths = []
+        for root, dirs, files in os.walk("."):
+            dirs[:] = [d for d in dirs if d not in _SKIP_WALK_DIRS]
+            if ".git" not in root and "docs" not in root:
+                file_paths.extend(os.path.join(root, file) for file in files if file.endswith('.py'))
+
+        # The per-file work is read-and-scan bound and releases the GIL in
+        # the syscalls and C regex engine; executor.map keeps the results in
+        # walk order, so the output matches the sequential scan exactly.
+        if len(file_paths) > 1:
+            with ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1)) as executor:
+                for file_output in executor.map(scan_one_file, file_paths):
+                    output.extend(file_output)
+        else:
+            for file_path in file_paths:
+                output.extend(scan_one_file(file_path))
 
         output = Utils.limit_strings("\n".join(output), n=100)
         if not output:
@@ -1709,26 +2415,12 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
     def get_function_ranges(self,file_path: str)->list[tuple[int, int, str]]:
         # Try to parse the file to map lines to their enclosing functions.
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                source_lines = f.read().splitlines()
-        except Exception as e:
+            stat = os.stat(file_path)
+            return _function_ranges_cached(file_path, stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
             raise EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.FILE_NOT_FOUND.name,f"Error reading '{file_path}': {e}")
-        try:
-            tree = ast.parse("\n".join(source_lines), filename=file_path)
         except SyntaxError as e:
-            tree = None 
             raise EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.SYNTAX_ERROR.name,f"Error parsing '{file_path}': {e}, {traceback.format_exc()}")
-             # Fallback if file cannot be parsed.
-
-        func_ranges: list[tuple[int, int, str]] = []  # (start, end, name)
-        if tree is not None:
-            for node in ast.walk(tree):
-                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                    start = getattr(node, 'lineno', None)
-                    end = getattr(node, 'end_lineno', None)
-                    if start is not None and end is not None:
-                        func_ranges.append((start, end, node.name))
-        return func_ranges
 
     def _extract_function_matches(self,file_path: str, search_term: str, *, max_output_lines: int = 1000) -> str:
         '''
@@ -1738,22 +2430,68 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         '''
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                source_lines = f.read().splitlines()
+                data = f.read()
         except Exception as e:
             raise EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.FILE_NOT_FOUND.name,f"Error reading '{file_path}': {e}")
 
-        # Identify all lines that contain the search term.
-        match_lines = [idx + 1 for idx, line in enumerate(source_lines) if search_term in line]
+        # Keep the source as one string and slice against newline offsets
+        # instead of materializing a per-line list: with the -1/len(data)
+        # sentinels, line i (1-based) is data[nls[i-1]+1:nls[i]].
+        nls = [-1]
+        pos = data.find('\n')
+        while pos != -1:
+            nls.append(pos)
+            pos = data.find('\n', pos + 1)
+        nls.append(len(data))
+        n_lines = len(nls) - 1
+        if not data or data.endswith('\n'):
+            # A trailing newline terminates the last line rather than
+            # opening a new (empty) one.
+            n_lines -= 1
+
+        def _line(i: int) -> str:
+            return data[nls[i - 1] + 1:nls[i]]
+
+        # Identify all lines that contain the search term. Plain substring
+        # scan by default; an explicit "re:" prefix opts into regex matching
+        # (a term that fails to compile is treated as a literal again).
+        term_re = None
+        if search_term.startswith("re:"):
+            try:
+                term_re = re.compile(search_term[3:])
+            except re.error:
+                term_re = None
+        if term_re is not None:
+            match_lines = [i for i in range(1, n_lines + 1) if term_re.search(_line(i))]
+        elif not search_term:
+            match_lines = list(range(1, n_lines + 1))
+        elif '\n' in search_term:
+            # Individual lines never contain a newline, so such a term
+            # cannot match.
+            match_lines = []
+        else:
+            # One C-level find pass over the whole buffer; a newline-free
+            # match always lies within a single line, so mapping its start
+            # offset through the newline table gives the line number.
+            match_lines = []
+            last_line = -1
+            step = len(search_term)
+            pos = data.find(search_term)
+            while pos != -1:
+                line_no = bisect.bisect_left(nls, pos, 1)
+                if line_no != last_line and line_no <= n_lines:
+                    match_lines.append(line_no)
+                    last_line = line_no
+                pos = data.find(search_term, pos + step)
         if not match_lines:
             raise EnhancedToolManager.Error(EnhancedToolManager.Error.ErrorType.SEARCH_TERM_NOT_FOUND.name,f"'{search_term}' not found in file '{file_path}'")
 
         func_ranges=self.get_function_ranges(file_path)
+        outer_ranges=_outermost_ranges(func_ranges)
+        starts=[span[0] for span in outer_ranges]
 
         def _containing_function(line_no: int):
-            for start, end, name in func_ranges:
-                if start <= line_no <= end:
-                    return (start, end, name)
-            return None
+            return _range_for_line(outer_ranges, starts, line_no)
 
         functions_to_return: list[tuple[int, int, str]] = []
         standalone_lines: list[int] = []
@@ -1766,11 +2504,11 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
 
         chunks: list[str] = []
         for start, end, name in functions_to_return:
-            func_src = "\n".join(source_lines[start - 1:end])
+            func_src = data[nls[start - 1] + 1:nls[end]]
             chunks.append(f"(lines {start}-{end}):\n{func_src}")
 
         for ln in standalone_lines:
-            chunks.append(f"{ln}:{source_lines[ln - 1]}")
+            chunks.append(f"{ln}:{_line(ln)}")
 
         return Utils.limit_strings("\n\n".join(chunks), n=max_output_lines)
 
@@ -1815,38 +2553,36 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         """
         try:
             # Stage modified/untracked files with desired extensions, excluding agent files.
-            exts = (".py", ".ini", ".cfg", ".toml")
-            exclude = {"src/agent.py", "src/agent_runner.py"}
+            # Extension and exclusion filtering is pushed into git's own
+            # pathspec matching instead of a Python post-filter over the list.
+            pathspecs = ["*.py", "*.ini", "*.cfg", "*.toml",
+                         ":(exclude)src/agent.py", ":(exclude)src/agent_runner.py"]
             # Exclude any generated test files or files modified via test generation tool
             try:
                 for _p in getattr(self, "generated_test_files", []):
                     # store as relative paths similar to git ls-files output
-                    exclude.add(os.path.relpath(_p))
+                    pathspecs.append(f":(exclude){os.path.relpath(_p)}")
             except Exception:
                 pass
 
             # Discover modified + untracked files
-            ls = subprocess.run(
-                ["git", "ls-files", "-m", "-o", "--exclude-standard"],
+            to_add = subprocess.run(
+                ["git", "ls-files", "-m", "-o", "--exclude-standard", "--"] + pathspecs,
                 capture_output=True, text=True, timeout=30, check=True
             ).stdout.splitlines()
 
-            to_add = [f for f in ls if f.endswith(exts) and f not in exclude]
             if to_add:
                 subprocess.run(["git", "add", "--"] + to_add, check=True, timeout=30)
 
             # Produce a clean, parseable patch (no colors; standard unified diff).
+            # Bytes capture with a single decode at the end: text mode would
+            # buffer through the universal-newline layer and corrupt any
+            # CRLF content inside the hunks.
             diff = subprocess.run(
                 ["git", "diff", "--cached", "--no-color", "--unified=3"],
-                capture_output=True, text=True, timeout=30, check=True
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30, check=True
             )
-
-            # Log stderr separately so it never pollutes the patch.
-            if diff.stderr:
-                pass
-
-            patch_text = diff.stdout or ""
-            return patch_text
+            return diff.stdout.decode("utf-8", errors="replace")
         except Exception as e:
             return f"Error generating git patch: {e}"
     
@@ -1873,7 +2609,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         '''
         if self.test_runner == "pytest":
             print("CMD: pytest ", file_paths)
-            result = subprocess.run(["pytest"] + file_paths, shell=True, capture_output=True, text=True, timeout=90)
+            result = subprocess.run(["pytest"] + file_paths, capture_output=True, text=True, timeout=90)
             output = (result.stdout or "") + (result.stderr or "")
         elif self.test_runner == "unittest":
             print("CMD: python ", file_paths)
@@ -1889,17 +2625,15 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                 output += current_output
         else:
             if self.test_runner_mode == "MODULE":
-                modules = [filepath_to_module(f, os.getcwd(), self.test_runner) for f in file_paths]
-                cmd = f"{self.test_runner} {' '.join(modules)}"
-                print("CMD: ", cmd)
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=90)
-                output = (result.stdout or "") + (result.stderr or "")
+                targets = [filepath_to_module(f, os.getcwd(), self.test_runner) for f in file_paths]
             else:
-                files_to_test = [clean_filepath(f, os.getcwd(), self.test_runner) for f in file_paths]
-                cmd = f"{self.test_runner} {' '.join(files_to_test)}"
-                print("CMD: ", cmd)
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=90)
-                output = (result.stdout or "") + (result.stderr or "")
+                targets = [clean_filepath(f, os.getcwd(), self.test_runner) for f in file_paths]
+            # List form skips the shell fork and any shell interpretation of
+            # the target paths; shlex.split keeps multi-word runners working.
+            cmd = shlex.split(self.test_runner) + targets
+            print("CMD: ", " ".join(cmd))
+            result = subprocess.run(cmd, capture_output=True, text=True, timeout=90)
+            output = (result.stdout or "") + (result.stderr or "")
         return output
     
     @EnhancedToolManager.tool
@@ -1948,9 +2682,9 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             if django_test_names:
                 tests_str = " ".join(django_test_names)
                 cmd = f"{sys.executable} {runtests_path} {tests_str} --parallel=1 -v 2"
-                result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=timeout_secs)
+                result = _run_test_command(cmd, timeout_secs)
                 
-                logger.info(f"Run tests command result: {result}")
+                logger.info('Run tests command result: %s', result)
                 
                 out = (result.stdout or "") + (result.stderr or "")
                 
@@ -1967,7 +2701,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                     except Exception as e:
                         output = out
                         logger.warning(f"Could not parse Django test output: {e}")
-                logger.info(f"RAW OUTPUT:\n\n {output}\n\n==========================")
+                logger.info('RAW OUTPUT:\n\n %s\n\n==========================', output)
                 return output, True
                 
         except subprocess.TimeoutExpired:
@@ -1979,14 +2713,11 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         # Fall back to pytest
         try:
             last_test_runner = 'pytest'
-            # Build proper arguments list for pytest.main()
-            if files_to_test:
-                file_paths_str = ", ".join([f"'{f}'" for f in files_to_test]) + ", "
-            else:
-                file_paths_str = ""
-            command = PYTEST_COMMAND_TEMPLATE.format(file_paths=file_paths_str)
-            result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=60)
-            out = (result.stdout or "") + (result.stderr or "")
+            # One batched pytest.main() call covers every requested file.
+            _, out = run_tests(files_to_test, timeout=60)
+            # Cap before parsing: every splitlines/regex scan below then
+            # operates on a bounded string regardless of suite verbosity.
+            out = _cap_output(out)
             output, success, failed_count = self.analyze_pytest_output(out)
             if self.test_runner != 'pytest' and self._check_dependency_errors(output):
                 last_test_runner = self.test_runner
@@ -2018,18 +2749,10 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                         cmd = f"{self.test_runner} --parallel=1 {' '.join(modules)}"
                     else:
                         cmd = f"{self.test_runner} {' '.join(modules)}"
-                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
-                    out = (result.stdout or "") + (result.stderr or "")
+                    result = _run_test_command(cmd, 60)
+                    out = _cap_output((result.stdout or "") + (result.stderr or ""))
                     success = False if "error" in out.lower() else True
-                    if len(out) > 20000:
-                        lines = out.splitlines()
-                        if len(lines) > 500:
-                            output = "\n".join(lines[:400] + ["... ({} lines omitted) ...".format(len(lines)-500)] + lines[-100:])
-                        else:
-                            output = out
-                    else:
-                        output = out
-                    return output, success
+                    return out, success
                 else:
                     # Default file-based runner
                     files_to_test = [clean_filepath(f, "repo", self.test_runner) for f in files_to_test]
@@ -2038,28 +2761,14 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                         cmd = f"{self.test_runner} --parallel=1 {' '.join(files_to_test)}"
                     else:
                         cmd = f"{self.test_runner} {' '.join(files_to_test)}"
-                    result = subprocess.run(cmd, shell=True, capture_output=True, text=True, timeout=60)
-                    out = (result.stdout or "") + (result.stderr or "")
+                    result = _run_test_command(cmd, 60)
+                    out = _cap_output((result.stdout or "") + (result.stderr or ""))
                     success = False if "error" in out.lower() else True
-                    if len(out) > 20000:
-                        lines = out.splitlines()
-                        if len(lines) > 500:
-                            output = "\n".join(lines[:400] + ["... ({} lines omitted) ...".format(len(lines)-500)] + lines[-100:])
-                        else:
-                            output = out
-                    else:
-                        output = out
                     return out, success
 
             if not success:
-                if len(out) > 20000:
-                    lines = out.splitlines()
-                    if len(lines) > 500:
-                        output = "\n".join(lines[:400] + ["... ({} lines omitted) ...".format(len(lines)-500)] + lines[-100:])
-                    else:
-                        output = out
-                else:
-                    output = out
+                # `out` was already capped above; no line-count pass needed.
+                output = out
             else:
                 if self.failed_count == -1:
                     self.failed_count = failed_count
@@ -2067,14 +2776,14 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                     debug_prints = self._extract_debug_prints_from_pytest(out)
                     failed_test_names = self._extract_failed_test_names(output)
                     if debug_prints and failed_test_names:
-                        output += "\n\n=================================== Debug Prints ===================================\n\n"
+                        parts = ["\n\n=================================== Debug Prints ===================================\n\n"]
                         for test_name, prints in debug_prints.items():
                             if test_name in failed_test_names:
                                 if len(prints) > 0:
-                                    output += f"\n---------------------------------- Debug prints for {test_name} ----------------------------------\n"
-                                    for printer in prints:
-                                        output += f"\n{printer}"
-                        output += "\n\n=================================== End of Debug Prints ===================================\n\n"
+                                    parts.append(f"\n---------------------------------- Debug prints for {test_name} ----------------------------------\n")
+                                    parts.extend(f"\n{printer}" for printer in prints)
+                        parts.append("\n\n=================================== End of Debug Prints ===================================\n\n")
+                        output += render_prompt(parts)
 
                 if self.failed_count > failed_count: # if you've made progress, checkpoint your progress
                     if failed_count > 0:
@@ -2093,50 +2802,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         """
         Check if the output contains dependency errors.
         """
-        # Check for all possible dependency error messages in the output
-        dependency_error_signatures = [
-            "ModuleNotFoundError",
-            "No module named",
-            "ImportError: cannot import name",
-            "ImportError: No module named",
-            "ImportError: attempted relative import",
-            "ImportError: cannot import module",
-            "ImportError: attempted import error",
-            "ImportError: DLL load failed",
-            "ImportError: dynamic module does not define",
-            "ImportError: cannot import",
-            "ImportError: missing dependency",
-            "ImportError: failed to import",
-            "ImportError: cannot open shared object file",
-            "ImportError: cannot load library",
-            "ImportError: undefined symbol",
-            "ImportError: bad magic number",
-            "ImportError: incompatible library",
-            "pkg_resources.DistributionNotFound",
-            "pkg_resources.VersionConflict",
-            "ModuleNotFoundError:",
-            "ImportError:",
-            "INTERNALERROR",
-            "No module named",
-            "Could not find a version that satisfies the requirement",
-            "ERROR: Could not find a version that satisfies the requirement",
-            "ERROR: No matching distribution found for",
-            "ImportError",
-            "not configured",
-            "ModuleNotFoundError",
-            "No module named",
-            "missing module named",
-            "missing dependency",
-            "Failed to import",
-            "Could not import",
-            "cannot import",
-            "cannot open shared object file",
-            "undefined symbol",
-            "bad magic number",
-            "incompatible library",
-        ]
-        output_lower = output.lower()
-        return any(sig.lower() in output_lower for sig in dependency_error_signatures)
+        return _DEP_ERROR_RE.search(output) is not None
 
     def analyze_pytest_output(self, output) -> tuple[str, bool, int]:
         """
@@ -2147,7 +2813,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             return "Invalid pytest output.", False, 0
         
         # Detect if this is meta-testing (multiple test session starts)
-        session_starts = list(re.finditer(r'={5,}\s*test session starts\s*={5,}', output, re.IGNORECASE))
+        session_starts = list(_SESSION_START_RE.finditer(output))
         
         if len(session_starts) > 1:
             # Meta-testing scenario - use specialized parser
@@ -2156,14 +2822,41 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             # Regular pytest scenario - use original logic
             return self._analyze_regular_pytest_output(output)
 
+    def _analyze_meta_pytest_output(self, output) -> tuple[str, bool, int]:
+        """
+        Parse output holding several pytest sessions (sharded run_tests emits
+        one per shard): each session goes through the regular parser on its
+        own, then the results merge — failure counts add up, overall success
+        needs every session green, and failing sessions' reports concatenate.
+        """
+        starts = [m.start() for m in _SESSION_START_RE.finditer(output)]
+        if not starts:
+            return self._analyze_regular_pytest_output(output)
+        # Stray stderr ahead of the first header belongs to the first session.
+        starts[0] = 0
+        segments = [output[s:e] for s, e in zip(starts, starts[1:] + [len(output)])]
+        reports = []
+        total_failed = 0
+        all_parsed = True
+        for segment in segments:
+            report, ok, failed = self._analyze_regular_pytest_output(segment)
+            total_failed += failed
+            all_parsed = all_parsed and ok
+            # The regular parser signals a clean session with its sentinel
+            # string (its boolean means "parsed", not "passed").
+            if report != "Successfully ran all tests.":
+                reports.append(report)
+        if not reports:
+            return "Successfully ran all tests.", True, 0
+        return "\n\n".join(reports), all_parsed, total_failed
+
     def _analyze_regular_pytest_output(self, output) -> tuple[str, bool, int]:
         """
         Original pytest output parsing logic for regular (non-meta) test runs.
         """
         def extract_short_summary(output_text):
             """Extract the short test summary info section from pytest output."""
-            summary_pattern = re.compile(r'={5,}\s*short test summary info\s*={5,}', re.IGNORECASE)
-            summary_match = summary_pattern.search(output_text)
+            summary_match = _SHORT_SUMMARY_RE.search(output_text)
             
             if not summary_match:
                 return ""
@@ -2171,8 +2864,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             summary_start = summary_match.end()
             
             # Find the end of summary section (look for next section with === or end of output)
-            end_pattern = re.compile(r'={5,}.*?={5,}', re.IGNORECASE)
-            end_match = end_pattern.search(output_text, summary_start + 1)
+            end_match = _SECTION_HEADER_RE.search(output_text, summary_start + 1)
             
             if end_match:
                 summary_end = end_match.start()
@@ -2197,7 +2889,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         
         try:
 
-            logging.info(f"PYTEST OUTPUT: {output}")
+            logging.info('PYTEST OUTPUT: %s', output)
             # If no proper pytest session, try to analyze what we can
             if "test session starts" not in output:
                 # Check if we have any failure indicators
@@ -2209,7 +2901,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                     return f"Unexpected test output (no session start): {output[:100]}...", False, 0
             
             short_summary = extract_short_summary(output)
-            logging.info(f"SHORT SUMMARY PYTEST OUTPUT: {short_summary}")
+            logging.info('SHORT SUMMARY PYTEST OUTPUT: %s', short_summary)
             # if "most likely due to a circular import" in output:
             #     return "Tests failed due to circular import" + short_summary, True, 0
             # # Check for recursion errors first
@@ -2230,15 +2922,14 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                 failed_count = len(failed_names)
             
             # Also try to parse the summary line for other counts if available
-            summary_line_pattern = re.compile(r'={3,}.*?\b\d+\.\d+s\s*(\([^)]+\))?\s*={3,}', re.IGNORECASE)
-            summary_match = summary_line_pattern.search(short_summary)
+            summary_match = _SUMMARY_LINE_RE.search(short_summary)
 
             if summary_match:
                 summary_line = summary_match.group()
                 
                 # Extract all "number word" patterns from the summary line
                 # This handles any order and missing sections
-                result_patterns = re.findall(r'(\d+)\s+(\w+)', summary_line)
+                result_patterns = _RESULT_COUNT_RE.findall(summary_line)
                 
                 for count, result_type in result_patterns:
                     count = int(count)
@@ -2267,11 +2958,8 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             
             # Look for failures section
             failure_sections = []
-            failures_pattern = re.compile(r'={5,}\s*FAILURES\s*={5,}', re.IGNORECASE)
-            errors_pattern = re.compile(r'={5,}\s*ERRORS\s*={5,}', re.IGNORECASE)
-
-            failures_match = failures_pattern.search(output)
-            errors_match = errors_pattern.search(output)
+            failures_match = _FAILURES_HEADER_RE.search(output)
+            errors_match = _ERRORS_HEADER_RE.search(output)
 
             if failures_match:
                 failure_sections.append(('FAILURES', failures_match))
@@ -2286,16 +2974,13 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
             
             # Find the end of failures section
             current_section_type = failure_sections[0][0]  # 'FAILURES' or 'ERRORS'
-            ending_patterns = [
-                re.compile(r'={5,}\s*short test summary info\s*={5,}', re.IGNORECASE),
-                re.compile(r'={5,}\s*warnings summary\s*={5,}', re.IGNORECASE),
-            ]
+            ending_patterns = [_SHORT_SUMMARY_RE, _WARNINGS_HEADER_RE]
 
             # Only add the opposite section type as ending pattern
             if current_section_type == 'FAILURES':
-                ending_patterns.append(re.compile(r'={5,}\s*ERRORS\s*={5,}', re.IGNORECASE))
+                ending_patterns.append(_ERRORS_HEADER_RE)
             elif current_section_type == 'ERRORS':
-                ending_patterns.append(re.compile(r'={5,}\s*FAILURES\s*={5,}', re.IGNORECASE))
+                ending_patterns.append(_FAILURES_HEADER_RE)
 
             failures_end = len(output)
             for pattern in ending_patterns:
@@ -2310,8 +2995,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                 return "No failure details found." + short_summary, False, 0
             
             # Split individual test failures - look for test separator lines
-            failure_pattern = re.compile(r'_{5,}\s+(.+?)\s+_{5,}')
-            failure_separators = list(failure_pattern.finditer(failures_content))
+            failure_separators = list(_FAILURE_SEPARATOR_RE.finditer(failures_content))
             
             if not failure_separators:
                 return failures_content + short_summary, False, 0  # Return as-is if we can't parse it
@@ -2413,17 +3097,16 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         debug_prints = {}
         lines = pytest_output.splitlines()
         
-        # Pattern to match test function names
-        test_name_pattern = r'^([^:]+::[^:\s]+(?:::[^:\s]+)?)'
-        
         current_test = None
         current_prints = []
         
         for line in lines:
             line_stripped = line.strip()
-            
-            # Check if this line starts a test
-            test_match = re.match(test_name_pattern, line)
+
+            # Check if this line starts a test. The cheap substring gate
+            # skips the regex on the vast majority of lines, which contain
+            # no '::' at all.
+            test_match = _TEST_NAME_RE.match(line) if '::' in line else None
             if test_match:
                 # Save previous test's prints if any
                 if current_test and current_prints:
@@ -2446,8 +3129,8 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
                 current_test = None
                 current_prints = []
             
-            # Check if we hit a section divider
-            elif re.match(r'^={5,}', line_stripped):
+            # Check if we hit a section divider (^={5,} is just a prefix test)
+            elif line_stripped.startswith('====='):
                 # Save current test's prints if any
                 if current_test and current_prints:
                     debug_prints[current_test] = current_prints.copy()
@@ -2467,31 +3150,33 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         
         return filtered_debug_prints
 
-    def _extract_failed_test_names(self, pytest_output: str, test_files: Optional[List[str]] = None) -> list[str]:
+    def _extract_failed_test_names(self, pytest_output: str, test_files: Optional[List[str]] = None) -> set[str]:
         """
         Extract FAILED test function names from pytest output.
-        
+
         Args:
             pytest_output: String containing pytest output
             test_files: List of test files to filter by
-            
+
         Returns:
-            List of failed test names in format "file/path::test_function"
+            Set of failed test names in format "file/path::test_function";
+            callers only take membership and len(), and the set keeps the
+            debug-prints lookup O(1) per test.
         """
        
 
         failed_tests = set()
-        
-        for line in pytest_output.splitlines():
-            if 'FAILED' in line:
-                lines = line.split(' ')
-                # logging.info(f"FOUND FAILED LINE: {line}")
-                clean_name = re.sub(r'\x1b\[[0-9;]*m', '', lines[1])
-                clean_name = clean_name.split('[')[0]
-                if clean_name != '':
-                    failed_tests.add(clean_name)
-        
-        return list(failed_tests)
+
+        # One ANSI strip and one finditer pass over the whole blob instead
+        # of splitting every line; the horizontal-whitespace class keeps a
+        # trailing "... FAILED\n" from capturing the next line's first token.
+        clean_output = _ANSI_ESCAPE_RE.sub('', pytest_output)
+        for match in _FAILED_LINE_RE.finditer(clean_output):
+            clean_name = match.group(1).split('[')[0]
+            if clean_name != '':
+                failed_tests.add(clean_name)
+
+        return failed_tests
 
     @EnhancedToolManager.tool
     def run_code(self,content:str,file_path:str)->str:
@@ -2512,7 +3197,7 @@ class FixTaskEnhancedToolManager(EnhancedToolManager):
         # Parse the file's AST to collect import statements
         
         with open(file_path, "r") as f:
-            tree = ast.parse(f.read(), filename=file_path)
+            tree = fast_parse(f.read(), file_path)
 
         disallowed_modules = set()
         for node in ast.walk(tree):
@@ -2680,7 +3365,7 @@ def agent_main(input_dict: Dict[str, Any], repo_dir: str = "repo", test_mode: bo
         
         problem_type = check_problem_type(input_dict.get("problem_statement"))
         
-        logger.info(f"problem_type: {problem_type}")
+        logger.info('problem_type: %s', problem_type)
         if problem_type == PROBLEM_TYPE_CREATE:
             result = process_create_task(input_dict)
         else:
@@ -2784,9 +3469,6 @@ def post_process_instruction(instruction: str) -> str:
         
         return "[\n    " + ",\n    ".join(processed_lines) + "\n]"
             
-    # Pattern to match ```text...``` blocks
-    pattern = r'```text\n(.*?)\n```'
-    
     def replace_text_block(match):
         text_content = match.group(1)
         processed_content = apply_markup(text_content)
@@ -2794,7 +3476,7 @@ def post_process_instruction(instruction: str) -> str:
         return f'```text\n{processed_content}\n```'
     
     # Replace all text blocks with processed versions
-    processed_instruction = re.sub(pattern, replace_text_block, instruction, flags=re.DOTALL)
+    processed_instruction = _TEXT_BLOCK_RE.sub(replace_text_block, instruction)
     return processed_instruction
 
 def generate_solution_with_multi_step_reasoning(problem_statement: str, code_skeleton: str) -> str:
@@ -2878,7 +3560,7 @@ def score_solution_quality(solution: str, problem_statement: str) -> float:
     
     # 1. SYNTAX VALIDATION (Critical - 30 points)
     try:
-        tree = ast.parse(code)
+        tree = fast_parse(code)
         score += 30.0  # Valid syntax is essential
         
         # Analyze AST structure for quality indicators
@@ -3056,19 +3738,19 @@ ALTERNATIVES: [brief mention of other viable options and why they're inferior]""
         ]
         
         response = EnhancedNetwork.make_request(comparison_messages, model=models[0])
-        logger.info(f"LLM evaluation response: {response[:200]}...")
+        logger.info('LLM evaluation response: %s...', response[:200])
         
         # Parse the response to extract the selected solution
-        best_solution_match = re.search(r'BEST_SOLUTION:\s*(\d+)', response)
+        best_solution_match = _BEST_SOLUTION_RE.search(response)
         if best_solution_match:
             selected_index = int(best_solution_match.group(1)) - 1  # Convert to 0-based index
             if 0 <= selected_index < len(solutions):
-                logger.info(f"LLM selected solution {selected_index + 1} as the best")
+                logger.info('LLM selected solution %s as the best', selected_index + 1)
                 
                 # Extract confidence level
-                confidence_match = re.search(r'CONFIDENCE:\s*(\w+)', response)
+                confidence_match = _CONFIDENCE_RE.search(response)
                 confidence = confidence_match.group(1) if confidence_match else "unknown"
-                logger.info(f"LLM confidence level: {confidence}")
+                logger.info('LLM confidence level: %s', confidence)
                 
                 # If confidence is low, consider using scoring as backup
                 if confidence.lower() == "low":
@@ -3095,7 +3777,7 @@ def improved_solution_selection(solutions: List[str], problem_statement: str, co
     if len(solutions) <= 1:
         return solutions[0] if solutions else ""
     
-    logger.info(f"Evaluating {len(solutions)} solutions for quality...")
+    logger.info('Evaluating %s solutions for quality...', len(solutions))
     
     # Strategy 1: Consensus check (only if we have strong consensus)
     solution_counts = Counter(solutions)
@@ -3106,17 +3788,17 @@ def improved_solution_selection(solutions: List[str], problem_statement: str, co
         
         # Only use consensus if it's a strong majority (>= 60%)
         if consensus_count >= max(2, total_solutions * 0.6):
-            logger.info(f"Strong consensus found: solution appeared {consensus_count}/{total_solutions} times ({consensus_count/total_solutions*100:.1f}%)")
+            logger.info('Strong consensus found: solution appeared %s/%s times (%.1f%%)', consensus_count, total_solutions, consensus_count/total_solutions*100)
             return consensus_solution
         else:
-            logger.info(f"Weak consensus: {consensus_count}/{total_solutions} times, proceeding with detailed analysis")
+            logger.info('Weak consensus: %s/%s times, proceeding with detailed analysis', consensus_count, total_solutions)
     
     # Strategy 2: Advanced quality scoring
     scored_solutions = []
     for i, solution in enumerate(solutions, 1):
         score = score_solution_quality(solution, problem_statement)
         scored_solutions.append((solution, score))
-        logger.info(f"Solution {i} quality score: {score:.2f}")
+        logger.info('Solution %s quality score: %.2f', i, score)
     
     # Sort by quality score
     scored_solutions.sort(key=lambda x: x[1], reverse=True)
@@ -3128,7 +3810,7 @@ def improved_solution_selection(solutions: List[str], problem_statement: str, co
     if len(top_solutions) > 1:
         score_diff = top_solutions[0][1] - top_solutions[1][1]
         if score_diff >= 15.0:  # Significant quality difference
-            logger.info(f"Clear winner: top solution has {score_diff:.2f} point advantage")
+            logger.info('Clear winner: top solution has %.2f point advantage', score_diff)
             return top_solutions[0][0]
     
     # For close scores or when we want maximum quality assurance, use LLM
@@ -3140,7 +3822,7 @@ def improved_solution_selection(solutions: List[str], problem_statement: str, co
     
     # Log the final decision
     selected_score = next((score for sol, score in scored_solutions if sol == selected_solution), 0)
-    logger.info(f"Final selection: solution with quality score {selected_score:.2f}")
+    logger.info('Final selection: solution with quality score %.2f', selected_score)
     
     return selected_solution
 
@@ -3155,14 +3837,14 @@ def generate_initial_solution(problem_statement: str, code_skeleton: str) -> str
     
     while len(solutions) < 5 and retry < 20:
         try:
-            logger.info(f"Generating solution {len(solutions) + 1}/5")
+            logger.info('Generating solution %s/5', len(solutions) + 1)
             
             # Try multi-step reasoning first
             solution = generate_solution_with_multi_step_reasoning(problem_statement, code_skeleton)
             
             if solution:
                 solutions.append(solution)
-                logger.info(f"Generated solution {len(solutions)} using multi-step reasoning")
+                logger.info('Generated solution %s using multi-step reasoning', len(solutions))
             else:
                 # Fallback to single-step approach
                 messages = [
@@ -3190,7 +3872,7 @@ def generate_initial_solution(problem_statement: str, code_skeleton: str) -> str
                 
                 if solution:
                     solutions.append(solution)
-                    logger.info(f"Generated solution {len(solutions)} using fallback approach")
+                    logger.info('Generated solution %s using fallback approach', len(solutions))
             
         except Exception as e:
             logger.error(f"Error generating solution {len(solutions) + 1}: {str(e)}")
@@ -3202,7 +3884,7 @@ def generate_initial_solution(problem_statement: str, code_skeleton: str) -> str
         return ""
     
     # Use improved solution selection
-    logger.info(f"Generated {len(solutions)} solutions, using improved selection strategy")
+    logger.info('Generated %s solutions, using improved selection strategy', len(solutions))
     return improved_solution_selection(solutions, problem_statement, code_skeleton)
 
 
@@ -3391,19 +4073,19 @@ MISSING: [any important test scenarios that might be missing]"""
         ]
         
         response = EnhancedNetwork.make_request(comparison_messages, model=models[0])
-        logger.info(f"LLM test case evaluation response: {response[:200]}...")
+        logger.info('LLM test case evaluation response: %s...', response[:200])
         
         # Parse the response to extract the selected test case
-        best_testcase_match = re.search(r'BEST_TESTCASE:\s*(\d+)', response)
+        best_testcase_match = _BEST_TESTCASE_RE.search(response)
         if best_testcase_match:
             selected_index = int(best_testcase_match.group(1)) - 1  # Convert to 0-based index
             if 0 <= selected_index < len(testcases):
-                logger.info(f"LLM selected test case {selected_index + 1} as the best")
+                logger.info('LLM selected test case %s as the best', selected_index + 1)
                 
                 # Extract confidence level
-                confidence_match = re.search(r'CONFIDENCE:\s*(\w+)', response)
+                confidence_match = _CONFIDENCE_RE.search(response)
                 confidence = confidence_match.group(1) if confidence_match else "unknown"
-                logger.info(f"LLM confidence level: {confidence}")
+                logger.info('LLM confidence level: %s', confidence)
                 
                 return testcases[selected_index]
             else:
@@ -3425,7 +4107,7 @@ def improved_testcase_selection(testcases: List[str], problem_statement: str, fi
     if len(testcases) <= 1:
         return testcases[0] if testcases else ""
     
-    logger.info(f"Evaluating {len(testcases)} test cases for quality...")
+    logger.info('Evaluating %s test cases for quality...', len(testcases))
     
     # Strategy 1: Consensus check (only if we have strong consensus)
     testcase_counts = Counter(testcases)
@@ -3436,10 +4118,10 @@ def improved_testcase_selection(testcases: List[str], problem_statement: str, fi
         
         # Only use consensus if it's a strong majority (>= 60%)
         if consensus_count >= max(2, total_testcases * 0.6):
-            logger.info(f"Strong consensus found: test case appeared {consensus_count}/{total_testcases} times ({consensus_count/total_testcases*100:.1f}%)")
+            logger.info('Strong consensus found: test case appeared %s/%s times (%.1f%%)', consensus_count, total_testcases, consensus_count/total_testcases*100)
             return consensus_testcase
         else:
-            logger.info(f"Weak consensus: {consensus_count}/{total_testcases} times, proceeding with LLM analysis")
+            logger.info('Weak consensus: %s/%s times, proceeding with LLM analysis', consensus_count, total_testcases)
     
     # Strategy 2: Use LLM for quality evaluation
     logger.info("Using LLM for detailed test case analysis")
@@ -3464,14 +4146,14 @@ def generate_test_files(problem_statement: str, files_to_test: str, code_skeleto
     
     while len(testcases) < 5 and retry < 15:
         try:
-            logger.info(f"Generating test case {len(testcases) + 1}/5")
+            logger.info('Generating test case %s/5', len(testcases) + 1)
             
             # Try multi-step reasoning first
             testcase = generate_testcases_with_multi_step_reasoning(problem_statement, files_to_test, code_skeleton)
             
             if testcase:
                 testcases.append(testcase)
-                logger.info(f"Generated test case {len(testcases)} using multi-step reasoning")
+                logger.info('Generated test case %s using multi-step reasoning', len(testcases))
             else:
                 # Fallback to single-step approach
                 messages = [
@@ -3499,7 +4181,7 @@ def generate_test_files(problem_statement: str, files_to_test: str, code_skeleto
                 
                 if testcase:
                     testcases.append(testcase)
-                    logger.info(f"Generated test case {len(testcases)} using fallback approach")
+                    logger.info('Generated test case %s using fallback approach', len(testcases))
             
         except Exception as e:
             logger.error(f"Error generating test case {len(testcases) + 1}: {str(e)}")
@@ -3511,7 +4193,7 @@ def generate_test_files(problem_statement: str, files_to_test: str, code_skeleto
         return ""
     
     # Use improved test case selection
-    logger.info(f"Generated {len(testcases)} test cases, using quality-first selection strategy")
+    logger.info('Generated %s test cases, using quality-first selection strategy', len(testcases))
     return improved_testcase_selection(testcases, problem_statement, files_to_test, code_skeleton)
 
 def process_create_task(input_dict):
@@ -3558,13 +4240,14 @@ def process_create_task(input_dict):
     tool_manager = EnhancedToolManager()
     patch = tool_manager.get_final_git_patch()
 
-    logger.info(f"Generated patch create:\n{patch}")
+    logger.info('Generated patch create:\n%s', patch)
 
     return patch
 
 def get_code_skeleton() -> str:
-    # Initialize the result string
-    result = ""
+    # Collect per-file chunks and join once at the end; += on the growing
+    # result string would recopy the whole skeleton for every file.
+    parts = []
     
     # Walk through the current directory
     for root, _, files in os.walk("."):
@@ -3575,9 +4258,9 @@ def get_code_skeleton() -> str:
                 with open(file_path, "r") as f:
                     content = f.read()
                 # Concatenate the file name and content
-                result += f"{file}\n{{\n{content}\n}}\n\n"
+                parts.append(f"{file}\n{{\n{content}\n}}\n\n")
     
-    return result
+    return render_prompt(parts)
 
 def get_directory_tree(start_path: str = '.') -> str:
 
@@ -3719,7 +4402,7 @@ def count_test_cases(file_path: str) -> int:
             content = f.read()
 
         import re
-        test_functions = re.findall(r'^\s*def\s+test_\w+', content, re.MULTILINE)
+        test_functions = _TEST_FUNC_DEF_RE.findall(content)
         return len(test_functions)
     
     except (FileNotFoundError, UnicodeDecodeError):
@@ -3782,7 +4465,7 @@ def process_fix_task(input_dict: Dict[str, Any], run_id):
     cwd = os.getcwd()
     
     test_runner, test_runner_mode = get_test_runner_and_mode()
-    logger.info(f"Detected test runner: {test_runner} with mode: {test_runner_mode}")
+    logger.info('Detected test runner: %s with mode: %s', test_runner, test_runner_mode)
     file_paths = None
     test_paths = None
     try:
@@ -3810,7 +4493,7 @@ def process_fix_task(input_dict: Dict[str, Any], run_id):
             system_prompt=FIX_TASK_SYSTEM_PROMPT,
             task_type="fix"
         )
-        logger.info(f"SWE patch: {patch_text}")
+        logger.info('SWE patch: %s', patch_text)
 
     except Exception as e:
         import traceback  # Ensure traceback is accessible
@@ -3821,7 +4504,7 @@ def process_fix_task(input_dict: Dict[str, Any], run_id):
 
     return patch_text
 
-TEST_PATCH_FIND_SYSTEM_PROMPT_TEMPLATE_V0 = textwrap.dedent("""
+TEST_PATCH_FIND_SYSTEM_PROMPT_TEMPLATE_V0 = """
 # 🧠 Test Function Finder
 You are a code analysis expert tasked with identifying test functions that directly validate the issue described in the problem statement. Follow this structured workflow carefully.
 
@@ -3874,16 +4557,16 @@ You have access to the following tools:-
 {tools_docs}
 
 {format_prompt}
-""")
+"""
 
 
-PATCH_FIND_INSTANCE_PROMPT_TEMPLATE = textwrap.dedent("""
+PATCH_FIND_INSTANCE_PROMPT_TEMPLATE = """
 [CRITICAL FIRST DECISION FOCUS]
 
 Problem Statement:
 {problem_statement}
 
-""")
+"""
 
 def test_find_workflow(problem_statement: str, *, timeout: int, run_id_1: str, instance_id: str = "") -> tuple[List[str], List[str]]:
     run_id = run_id_1
@@ -3899,8 +4582,8 @@ def test_find_workflow(problem_statement: str, *, timeout: int, run_id_1: str, i
         ],
 
     )
-    logger.info(f"[TEST_PATCH_FIND] Starting test patch find agent execution...")
-    system_prompt = TEST_PATCH_FIND_SYSTEM_PROMPT_TEMPLATE_V0.format(tools_docs=tool_manager.get_tool_docs(),format_prompt=FORMAT_PROMPT_V0)
+    logger.info('[TEST_PATCH_FIND] Starting test patch find agent execution...')
+    system_prompt = render_system_prompt(TEST_PATCH_FIND_SYSTEM_PROMPT_TEMPLATE_V0, tool_manager.get_tool_docs(), FORMAT_PROMPT_V0)
     instance_prompt = PATCH_FIND_INSTANCE_PROMPT_TEMPLATE.format(problem_statement=problem_statement)
 
     #QA.SYSTEM_PROMPT=QA.SYSTEM_PROMPT.format(problem_statement=problem_statement)
@@ -3909,7 +4592,7 @@ def test_find_workflow(problem_statement: str, *, timeout: int, run_id_1: str, i
     logs: List[str] = []
 
     for step in range(MAX_STEPS_TEST_PATCH_FIND):
-        logger.info(f"[TEST_PATCH_FIND] Execution step {step + 1}/{MAX_STEPS_TEST_PATCH_FIND}")
+        logger.info('[TEST_PATCH_FIND] Execution step %s/%s', step + 1, MAX_STEPS_TEST_PATCH_FIND)
         
         if time.time() - start_time > timeout:
             cot.add_action(EnhancedCOT.Action(next_thought="global timeout reached",next_tool_name="",next_tool_args={},observation="",is_error=True,inference_error_counter={},request_data=[]))
@@ -3926,9 +4609,9 @@ def test_find_workflow(problem_statement: str, *, timeout: int, run_id_1: str, i
         messages.append({"role": "system", "content": STOP_INSTRUCTION})
 
         if cot.is_thought_repeated():
-            logger.info(f"[TEST_PATCH_FIND] Thought repeated, adding DO NOT REPEAT TOOL CALLS instruction")
+            logger.info('[TEST_PATCH_FIND] Thought repeated, adding DO NOT REPEAT TOOL CALLS instruction')
             last_thought = cot.thoughts[-1]
-            messages.append({"role": "user", "content": DO_NOT_REPEAT_TOOL_CALLS.format(previous_response=f"next_tool_name:{last_thought.next_tool_name}\n next_tool_args:{last_thought.next_tool_args}")})
+            messages.append({"role": "user", "content": _dont_repeat(f"next_tool_name:{last_thought.next_tool_name}\n next_tool_args:{_dump_args(last_thought.next_tool_args)}")})
     
         try:
             next_thought, next_tool_name, next_tool_args,raw_text,total_attempts,error_counter,messages = EnhancedNetwork.inference(messages, model=GLM_MODEL_NAME,run_id=run_id)
@@ -3941,17 +4624,17 @@ def test_find_workflow(problem_statement: str, *, timeout: int, run_id_1: str, i
             cot.add_action(EnhancedCOT.Action(next_thought=error_msg,next_tool_name="",next_tool_args={},observation="",is_error=True,raw_response=raw_text,total_attempts=total_attempts, inference_error_counter=error_counter,request_data=messages))
             break
         
-        logger.info(f"[TEST_PATCH_FIND] About to execute operation: {next_tool_name}")
+        logger.info('[TEST_PATCH_FIND] About to execute operation: %s', next_tool_name)
        
         try:
-            logger.info(f"[TEST_PATCH_FIND] next_thought: {next_thought}\nnext_tool_name: {next_tool_name}\nnext_tool_args: {next_tool_args}\n")
+            logger.info('[TEST_PATCH_FIND] next_thought: %s\nnext_tool_name: %s\nnext_tool_args: %s\n', next_thought, next_tool_name, next_tool_args)
             if '"' in next_tool_name or "'" in next_tool_name:
                 next_tool_name=next_tool_name.replace('"','')
                 next_tool_name=next_tool_name.replace("'","")
                 
             next_observation = tool_manager.get_tool(next_tool_name)(**next_tool_args) if next_tool_args else tool_manager.get_tool(next_tool_name)()
             logs.append(f"next_observation: {next_observation}\n\n")
-            logger.info(f"[TEST_PATCH_FIND] next_observation: {next_observation}")
+            logger.info('[TEST_PATCH_FIND] next_observation: %s', next_observation)
             cot.add_action(EnhancedCOT.Action(next_thought=next_thought,next_tool_name=next_tool_name,next_tool_args=next_tool_args,observation=next_observation,is_error=False,raw_response=raw_text,total_attempts=total_attempts,inference_error_counter=error_counter,request_data=messages))
         except EnhancedToolManager.Error as e:
             import traceback  # Ensure traceback is accessible
@@ -3974,7 +4657,7 @@ def test_find_workflow(problem_statement: str, *, timeout: int, run_id_1: str, i
         
         if next_tool_name == "test_patch_find_finish" and next_observation == 'finish':
             test_func_names = next_tool_args["test_func_names"]
-            logger.info(f'[TEST_PATCH_FIND] [CRITICAL] Workflow called test_patch_find_finish operation with test_func_names: {test_func_names}')
+            logger.info('[TEST_PATCH_FIND] [CRITICAL] Workflow called test_patch_find_finish operation with test_func_names: %s', test_func_names)
             logs.append(f"Workflow called test_patch_find_finish operation with test_func_names: {test_func_names}\n\n")
             return test_func_names, logs
             
@@ -3982,13 +4665,13 @@ def test_find_workflow(problem_statement: str, *, timeout: int, run_id_1: str, i
     else:
         # This happens if we exit the loop without breaking (reached MAX_STEPS)
         cot.add_action(EnhancedCOT.Action(next_thought="global timeout reached",next_tool_name="",next_tool_args={},observation="",is_error=True))
-        logger.info(f"[TEST_PATCH_FIND] [CRITICAL] Workflow completed after reaching MAX_STEPS ({MAX_STEPS_TEST_PATCH_FIND})")
+        logger.info('[TEST_PATCH_FIND] [CRITICAL] Workflow completed after reaching MAX_STEPS (%s)', MAX_STEPS_TEST_PATCH_FIND)
 
 def fix_task_solve_workflow(problem_statement: str, *, timeout: int, run_id_1: str, \
     test_runner: str = "pytest", test_runner_mode: str = "FILE", n_max_steps = MAX_FIX_TASK_STEPS, file_paths: List[str], test_paths: List[str] , instance_prompt, system_prompt,task_type:str) -> tuple[str, List[str], List[str]]:
-    logger.info(f"Starting {task_type} task workflow: timeout={timeout}s, max_steps={n_max_steps}, run_id={run_id_1}")
+    logger.info('Starting %s task workflow: timeout=%ss, max_steps=%s, run_id=%s', task_type, timeout, n_max_steps, run_id_1)
     cot=EnhancedCOT(latest_observations_to_keep=500)
-    logger.info(f"test_paths found: {test_paths}")
+    logger.info('test_paths found: %s', test_paths)
     if task_type == "fix":
         tool_manager=FixTaskEnhancedToolManager(
             test_runner=test_runner,
@@ -4009,7 +4692,7 @@ def fix_task_solve_workflow(problem_statement: str, *, timeout: int, run_id_1: s
             problem_statement=problem_statement,
             test_func_names = ', '.join(test_paths) if test_paths else 'None',
         )
-        system_prompt = system_prompt.format(tools_docs=tool_manager.get_tool_docs(),format_prompt=FORMAT_PROMPT_V0)
+        system_prompt = render_system_prompt(system_prompt, tool_manager.get_tool_docs(), FORMAT_PROMPT_V0)
     else:
         tool_manager=FixTaskEnhancedToolManager(
             test_runner=test_runner,
@@ -4028,13 +4711,13 @@ def fix_task_solve_workflow(problem_statement: str, *, timeout: int, run_id_1: s
             ],
         )
         instance_prompt = instance_prompt.format(problem_statement=problem_statement)
-        system_prompt = system_prompt.format(tools_docs=tool_manager.get_tool_docs(),format_prompt=FORMAT_PROMPT_V0)
+        system_prompt = render_system_prompt(system_prompt, tool_manager.get_tool_docs(), FORMAT_PROMPT_V0)
     start_time = time.time()
     logs: List[str] = []
     logs.append(f"cwd: {os.getcwd()}")
     
     for step in range(n_max_steps):
-        logger.info(f"Starting step {step+1}/{n_max_steps} (elapsed: {time.time() - start_time:.1f}s)")
+        logger.info('Starting step %s/%s (elapsed: %.1fs)', step+1, n_max_steps, time.time() - start_time)
         
         if time.time() - start_time > timeout:
             logger.warning(f"Global timeout reached at step {step+1} ({timeout}s)")
@@ -4052,12 +4735,12 @@ def fix_task_solve_workflow(problem_statement: str, *, timeout: int, run_id_1: s
     
         if cot.is_thought_repeated():
             last_thought = cot.thoughts[-1]
-            messages.append({"role": "user", "content": DO_NOT_REPEAT_TOOL_CALLS.format(previous_response=f"next_tool_name:{last_thought.next_tool_name}\n next_tool_args:{last_thought.next_tool_args}")})
+            messages.append({"role": "user", "content": _dont_repeat(f"next_tool_name:{last_thought.next_tool_name}\n next_tool_args:{_dump_args(last_thought.next_tool_args)}")})
     
         try:
-            logger.info(f"Step {step+1}/{n_max_steps}: Getting inference from LLM")
+            logger.info('Step %s/%s: Getting inference from LLM', step+1, n_max_steps)
             next_thought, next_tool_name, next_tool_args,raw_text,total_attempts,error_counter,messages = EnhancedNetwork.inference(messages, model=GLM_MODEL_NAME, run_id=run_id_1)
-            logger.info(f"LLM inference successful: tool={next_tool_name}, thought_length={len(next_thought) if next_thought else 0}")
+            logger.info('LLM inference successful: tool=%s, thought_length=%s', next_tool_name, len(next_thought) if next_thought else 0)
         except Exception as e:
             import traceback  # Ensure traceback is accessible
             error_msg=f"\n\nERROR: {repr(e)} {traceback.format_exc()}"
@@ -4069,10 +4752,10 @@ def fix_task_solve_workflow(problem_statement: str, *, timeout: int, run_id_1: s
                 next_tool_name=next_tool_name.replace('"','')
                 next_tool_name=next_tool_name.replace("'","")
             
-            logger.info(f"Executing tool: {next_tool_name} with args: {next_tool_args}")
+            logger.info('Executing tool: %s with args: %s', next_tool_name, next_tool_args)
             next_observation = tool_manager.get_tool(next_tool_name)(**next_tool_args) if next_tool_args else tool_manager.get_tool(next_tool_name)()
 
-            logger.info(f"Tool execution completed: {next_tool_name}\n\n Observation: {next_observation}")
+            logger.info('Tool execution completed: %s\n\n Observation: %s', next_tool_name, next_observation)
             cot.add_action(EnhancedCOT.Action(next_thought=next_thought,next_tool_name=next_tool_name,next_tool_args=next_tool_args,observation=next_observation,is_error=False,raw_response=raw_text,total_attempts=total_attempts,inference_error_counter=error_counter,request_data=messages))
         except EnhancedToolManager.Error as e:
             import traceback  # Ensure traceback is accessible
@@ -4103,6 +4786,6 @@ def fix_task_solve_workflow(problem_statement: str, *, timeout: int, run_id_1: s
             return None
     
     patch = tool_manager.get_final_git_patch()
-    logger.info(f"Workflow completed after {step+1 if 'step' in locals() else 'unknown'} steps, patch length: {len(patch) if patch else 0} chars")
+    logger.info('Workflow completed after %s steps, patch length: %s chars', step+1 if 'step' in locals() else 'unknown', len(patch) if patch else 0)
 
     return patch
\ No newline at end of file